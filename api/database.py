@@ -1,20 +1,95 @@
-
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from utils.db_pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool, instrument_engine, pool_options
+from utils.db_routing import RoutingSession
 import os
 
 DATABASE_URL = f"mysql+pymysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}@{os.getenv('MYSQL_HOST')}/{os.getenv('MYSQL_DATABASE')}"
+# 非同步連線（測試時可設定為 sqlite+aiosqlite:///...）
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    f"mysql+aiomysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}@{os.getenv('MYSQL_HOST')}/{os.getenv('MYSQL_DATABASE')}"
+)
+# 唯讀 replica 主機（逗號分隔，沿用 primary 的帳號與資料庫名稱），未設定時所有查詢都走 primary
+MYSQL_REPLICA_HOSTS = [host.strip() for host in os.getenv("MYSQL_REPLICA_HOSTS", "").split(",") if host.strip()]
+REPLICA_URLS = [
+    f"mysql+pymysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}@{host}/{os.getenv('MYSQL_DATABASE')}"
+    for host in MYSQL_REPLICA_HOSTS
+]
+ASYNC_REPLICA_URLS = [
+    f"mysql+aiomysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}@{host}/{os.getenv('MYSQL_DATABASE')}"
+    for host in MYSQL_REPLICA_HOSTS
+]
+
+# 連接池參數可透過環境變數 DB_POOL_SIZE / DB_MAX_OVERFLOW / DB_POOL_TIMEOUT / DB_POOL_RECYCLE / DB_POOL_PRE_PING 設定
+engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **pool_options())
+instrument_engine(engine, "primary")
+
+replica_engines = []
+for index, url in enumerate(REPLICA_URLS):
+    replica_engine = create_engine(url, poolclass=InstrumentedQueuePool, **pool_options())
+    instrument_engine(replica_engine, f"replica-{index}")
+    replica_engines.append(replica_engine)
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine, replica_binds=replica_engines
+)
+
+# 非同步 engine 與 session，供高流量的讀取路由使用
+async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **pool_options())
+instrument_engine(async_engine.sync_engine, "async")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_replica_engines = []
+for index, url in enumerate(ASYNC_REPLICA_URLS):
+    async_replica_engine = create_async_engine(url, poolclass=InstrumentedAsyncQueuePool, **pool_options())
+    instrument_engine(async_replica_engine.sync_engine, f"async-replica-{index}")
+    async_replica_engines.append(async_replica_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    sync_session_class=RoutingSession,
+    replica_binds=[e.sync_engine for e in async_replica_engines]
+)
 
 Base = declarative_base()
 
 # Dependency
-def get_db():
+def get_db(request: Request = None):
+    """GET 請求的唯讀查詢送往 replica，其餘請求使用 primary"""
+    db = SessionLocal()
+    db.use_replica = request is not None and request.method == "GET"
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_primary_db():
+    """強制使用 primary，供寫入後需立即讀取的路由使用"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_replica_db():
+    """唯讀查詢一律使用 replica（例如以 POST 觸發的報表）"""
     db = SessionLocal()
+    db.use_replica = True
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db(request: Request = None):
+    async with AsyncSessionLocal() as db:
+        db.sync_session.use_replica = request is not None and request.method == "GET"
+        yield db
+
+async def get_async_primary_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -5,6 +5,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from routes import estates, rooms, rentals, users, electric_record, file, schedules, accounting, overtime_payment, emails
 from routes import entry_table, auth, sop, upload, cache_management, schedule_replies, generate, leave_application, meeting_reservation, meeting_room
+from routes import db_management, imports
 from routes.leave_application import leave_type_router
 import json
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -13,7 +14,11 @@ from datetime import datetime, timezone, timedelta
 from database import get_db
 from models.file import Files as File
 from utils.cloudstorage import StorageService
-from utils import redis_config
+from utils import redis_config, cache_metrics
+from utils.query_stats import QueryStatsMiddleware
+from utils.cache_warmup import CACHE_WARMUP_ENABLED, CACHE_WARMUP_CRON, warm_up_cache, start_cache_warmup
+from utils import slow_query  # noqa: F401  註冊慢查詢紀錄的 SQLAlchemy 事件
+from utils import cache_invalidation  # noqa: F401  註冊寫入後自動清除快取的 SQLAlchemy 事件
 import logging
 
 # 設置時區和實例化 StorageService
@@ -61,6 +66,12 @@ scheduler.add_job(
     trigger=CronTrigger(hour=3, minute=0),  # 每天凌晨 3 點執行
     id="cleanup_orphan_files"
 )
+if CACHE_WARMUP_ENABLED:
+    scheduler.add_job(
+        warm_up_cache,
+        trigger=CronTrigger.from_crontab(CACHE_WARMUP_CRON),
+        id="cache_warmup"
+    )
 
 load_dotenv()
 app = FastAPI(title="Estate Management API")
@@ -85,7 +96,9 @@ routes_list = [
     generate,
     leave_application,
     meeting_room,
-    meeting_reservation
+    meeting_reservation,
+    db_management,
+    imports
 ]
 
 app.add_middleware(
@@ -94,8 +107,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-DB-Queries", "Server-Timing", "X-Next-Cursor",
+        "X-Import-Total", "X-Import-Imported", "X-Import-Rejected"
+    ],
 )
 
+# 統計每個請求的 SQL 數量與耗時，並記錄可能的 N+1 查詢
+app.add_middleware(QueryStatsMiddleware)
+
 # 註冊路由
 for route in routes_list:
     app.include_router(route.router)
@@ -104,20 +124,27 @@ app.include_router(leave_type_router)
 
 @app.on_event("startup")
 async def startup_event():
+    # 訂閱 L1 快取的跨 worker 失效訊息
+    redis_config.start_invalidation_listener()
     try:
         ping = redis_config.redis_client.ping()
         if ping:
             logging.info("Successfully connected to Redis")
+            # 在背景預熱熱門的租約與房間快取，不阻塞啟動
+            start_cache_warmup()
         else:
             logging.error("Failed to connect to Redis, ping returned False")
-            scheduler.start()
-            logging.info("Background scheduler started for orphan file cleanup")
     except Exception as e:
         logging.error(f"Strat up error: {e}")
+
+    scheduler.start()
+    logging.info("Background scheduler started for orphan file cleanup and cache warm-up")
     
 
 @app.on_event("shutdown")
 def shutdown_event():
+    # 送出本 worker 尚未合併的快取統計
+    cache_metrics.metrics.flush()
     scheduler.shutdown()
     print("Background scheduler shut down")
 
@@ -127,7 +154,8 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
+    # Redis 斷路器開路時快取直接略過，服務仍可運作
+    return {"status": "ok", "redis": redis_config.redis_breaker.snapshot()}
 
 @app.post("/callback")
 async def callback(request: Request):
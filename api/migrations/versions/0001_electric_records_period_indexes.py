@@ -0,0 +1,60 @@
+"""electric_records 每房每月唯一索引與遞減排序索引
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 先移除重複的年月記錄（保留 id 最大、也就是最後寫入的一筆），否則唯一索引無法建立
+    bind = op.get_bind()
+    if bind.dialect.name == "mysql":
+        op.execute(
+            """
+            DELETE older FROM electric_records AS older
+            JOIN electric_records AS newer
+              ON newer.room_id = older.room_id
+             AND newer.record_year = older.record_year
+             AND newer.record_month = older.record_month
+             AND newer.id > older.id
+            """
+        )
+    else:
+        op.execute(
+            """
+            DELETE FROM electric_records
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM electric_records
+                GROUP BY room_id, record_year, record_month
+            )
+            """
+        )
+
+    op.create_index(
+        "uq_electric_records_room_period",
+        "electric_records",
+        ["room_id", "record_year", "record_month"],
+        unique=True,
+    )
+    # 「最新讀數」查詢（依年月遞減取第一筆）可直接由索引取得 reading，不需回表
+    op.create_index(
+        "ix_electric_records_room_period_desc",
+        "electric_records",
+        ["room_id", sa.text("record_year DESC"), sa.text("record_month DESC"), "reading"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_electric_records_room_period_desc", table_name="electric_records")
+    op.drop_index("uq_electric_records_room_period", table_name="electric_records")
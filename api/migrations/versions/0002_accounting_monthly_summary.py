@@ -0,0 +1,43 @@
+"""accounting_monthly_summary 每月會計彙總表
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "accounting_monthly_summary",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("estate_id", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("accounting_tag", sa.String(255), nullable=False, server_default=""),
+        sa.Column("payment_method", sa.String(50), nullable=False, server_default=""),
+        sa.Column("total", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_accounting_monthly_summary_id", "accounting_monthly_summary", ["id"])
+    op.create_index(
+        "uq_accounting_summary_key",
+        "accounting_monthly_summary",
+        ["estate_id", "year", "month", "accounting_tag", "payment_method"],
+        unique=True,
+    )
+    # 建表後執行 python -m scripts.rebuild_accounting_summary 以既有資料回填
+
+
+def downgrade():
+    op.drop_table("accounting_monthly_summary")
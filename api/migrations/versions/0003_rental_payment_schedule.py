@@ -0,0 +1,100 @@
+"""rental_payment_schedule 租約繳費日期表
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+from dateutil.relativedelta import relativedelta
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+# 與 utils.payment_schedule.PAYMENT_INTERVALS 相同（migration 不匯入應用程式模組）
+PAYMENT_INTERVALS = {
+    "月繳": relativedelta(months=1),
+    "季繳": relativedelta(months=3),
+    "半年": relativedelta(months=6),
+    "年繳": relativedelta(years=1),
+}
+
+
+def _payment_interval(rental_info):
+    try:
+        info = json.loads(rental_info) if rental_info else {}
+    except (TypeError, ValueError):
+        return None
+    return PAYMENT_INTERVALS.get(info.get("money")) if isinstance(info, dict) else None
+
+
+def _backfill():
+    """依 id 分批展開既有租約的繳費日期"""
+    bind = op.get_bind()
+    rentals = sa.table(
+        "rentals",
+        sa.column("id", sa.Integer),
+        sa.column("start_date", sa.Date),
+        sa.column("end_date", sa.Date),
+        sa.column("rental_info", sa.Text),
+    )
+    schedule = sa.table(
+        "rental_payment_schedule",
+        sa.column("rental_id", sa.Integer),
+        sa.column("due_date", sa.Date),
+        sa.column("status", sa.String),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(rentals.c.id, rentals.c.start_date, rentals.c.end_date, rentals.c.rental_info)
+            .where(rentals.c.id > last_id)
+            .order_by(rentals.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        values = []
+        for row in rows:
+            interval = _payment_interval(row.rental_info)
+            if interval is None or row.start_date is None or row.end_date is None:
+                continue
+            due_date = row.start_date
+            while due_date <= row.end_date:
+                values.append({"rental_id": row.id, "due_date": due_date, "status": "pending"})
+                due_date += interval
+        if values:
+            bind.execute(schedule.insert(), values)
+
+
+def upgrade():
+    op.create_table(
+        "rental_payment_schedule",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("rental_id", sa.Integer(), sa.ForeignKey("rentals.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("due_date", sa.Date(), nullable=False),
+        sa.Column("amount", sa.DECIMAL(10, 2), nullable=True),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+    )
+    op.create_index("ix_rental_payment_schedule_id", "rental_payment_schedule", ["id"])
+    op.create_index("ix_rental_payment_schedule_due_date", "rental_payment_schedule", ["due_date"])
+    op.create_index(
+        "uq_rental_payment_schedule_rental_due",
+        "rental_payment_schedule",
+        ["rental_id", "due_date"],
+        unique=True,
+    )
+    _backfill()
+
+
+def downgrade():
+    op.drop_table("rental_payment_schedule")
@@ -0,0 +1,102 @@
+"""rentals 由 rental_info 拆出繳費週期、提前入住與起始電錶欄位
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+# 只保留已知的繳費週期，其他值與超過欄位長度的值存為 NULL（MySQL strict mode 下過長會寫入失敗）
+PAYMENT_FREQUENCIES = ("月繳", "季繳", "半年", "年繳")
+EARLY_CHECKIN_MAX_LENGTH = 50
+
+
+def _parse(rental_info):
+    if not rental_info:
+        return {}
+    try:
+        info = json.loads(rental_info)
+    except (TypeError, ValueError):
+        return {}
+    return info if isinstance(info, dict) else {}
+
+
+def _to_str(value, max_length):
+    if value in (None, ""):
+        return None
+    value = str(value)
+    return value if len(value) <= max_length else None
+
+
+def _to_float(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def upgrade():
+    op.add_column("rentals", sa.Column("payment_frequency", sa.String(20), nullable=True))
+    op.add_column("rentals", sa.Column("early_checkin", sa.String(EARLY_CHECKIN_MAX_LENGTH), nullable=True))
+    op.add_column("rentals", sa.Column("initial_electric", sa.Float(), nullable=True))
+    op.create_index("ix_rentals_payment_frequency", "rentals", ["payment_frequency"])
+
+    # 依 id 分批回填，避免一次更新整張表造成長時間鎖定
+    bind = op.get_bind()
+    rentals = sa.table(
+        "rentals",
+        sa.column("id", sa.Integer),
+        sa.column("rental_info", sa.Text),
+        sa.column("payment_frequency", sa.String),
+        sa.column("early_checkin", sa.String),
+        sa.column("initial_electric", sa.Float),
+    )
+    update = (
+        rentals.update()
+        .where(rentals.c.id == sa.bindparam("rental_id"))
+        .values(
+            payment_frequency=sa.bindparam("payment_frequency"),
+            early_checkin=sa.bindparam("early_checkin"),
+            initial_electric=sa.bindparam("initial_electric"),
+        )
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(rentals.c.id, rentals.c.rental_info)
+            .where(rentals.c.id > last_id, rentals.c.rental_info.isnot(None))
+            .order_by(rentals.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        params = []
+        for row in rows:
+            info = _parse(row.rental_info)
+            params.append({
+                "rental_id": row.id,
+                "payment_frequency": info.get("money") if info.get("money") in PAYMENT_FREQUENCIES else None,
+                "early_checkin": _to_str(info.get("early_checkin"), EARLY_CHECKIN_MAX_LENGTH),
+                "initial_electric": _to_float(info.get("initial_electric")),
+            })
+        bind.execute(update, params)
+
+
+def downgrade():
+    op.drop_index("ix_rentals_payment_frequency", table_name="rentals")
+    op.drop_column("rentals", "initial_electric")
+    op.drop_column("rentals", "early_checkin")
+    op.drop_column("rentals", "payment_frequency")
@@ -13,9 +13,11 @@ from models.room import Room      # 房間
 
 # 關聯模型
 from models.rental import Rental  # 租約
+from models.rental_payment_schedule import RentalPaymentSchedule  # 租約繳費日期
 
 # 交易和記錄模型
 from models.accouting import Accounting        # 會計記錄
+from models.accounting_summary import AccountingMonthlySummary  # 會計每月彙總
 from models.electric_record import ElectricRecord  # 電表記錄
 
 # 其他模型
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, func
+from database import Base
+
+class AccountingMonthlySummary(Base):
+    """會計記錄的每月彙總（物業 / 年月 / 類別 / 繳納方式），由寫入路徑增量維護"""
+    __tablename__ = "accounting_monthly_summary"
+    __table_args__ = (
+        Index(
+            "uq_accounting_summary_key",
+            "estate_id", "year", "month", "accounting_tag", "payment_method",
+            unique=True
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    estate_id = Column(Integer, nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    # NULL 無法參與唯一索引比對，未分類 / 未填寫以空字串儲存
+    accounting_tag = Column(String(255), nullable=False, server_default="")
+    payment_method = Column(String(50), nullable=False, server_default="")
+    total = Column(Float, nullable=False, server_default="0")
+    count = Column(Integer, nullable=False, server_default="0")
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
@@ -22,6 +22,8 @@ class AuthUser(Base):
     address = Column(Text, nullable=True)             # 地址
     notes = Column(Text, nullable=True)               # 備註
     is_active = Column(Boolean, default=True)
+    # 遞增後已簽發的 access token 全部失效（停用、角色、email 或密碼變更時）
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
 
@@ -1,9 +1,17 @@
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index, func, text
 from sqlalchemy.orm import relationship
 from database import Base
 
 class ElectricRecord(Base):
     __tablename__ = "electric_records"
+    __table_args__ = (
+        # 每個房間每月只有一筆讀數（migrations/versions/0001）
+        Index("uq_electric_records_room_period", "room_id", "record_year", "record_month", unique=True),
+        Index(
+            "ix_electric_records_room_period_desc",
+            "room_id", text("record_year DESC"), text("record_month DESC"), "reading"
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     room_id = Column(Integer, ForeignKey("rooms.id"), nullable=False)
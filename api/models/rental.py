@@ -1,8 +1,41 @@
-from sqlalchemy import Column, Integer, String, Text, Date, DECIMAL, ForeignKey, DateTime
+import json
+from sqlalchemy import Column, Integer, String, Text, Date, DECIMAL, Float, ForeignKey, DateTime
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from database import Base
 
+
+def parse_rental_info(rental_info):
+    """rental_info 的 JSON 內容，空值或格式錯誤時回傳空 dict"""
+    if not rental_info:
+        return {}
+    try:
+        info = json.loads(rental_info)
+    except (TypeError, ValueError):
+        return {}
+    return info if isinstance(info, dict) else {}
+
+
+# payment_frequency 只接受已知的繳費週期（與 utils.payment_schedule.PAYMENT_INTERVALS 一致），其他值存為 NULL
+PAYMENT_FREQUENCIES = ("月繳", "季繳", "半年", "年繳")
+EARLY_CHECKIN_MAX_LENGTH = 50
+
+
+def _to_str(value, max_length: int):
+    """轉為字串；空值或超過欄位長度時回傳 None（避免 MySQL strict mode 寫入失敗）"""
+    if value in (None, ""):
+        return None
+    value = str(value)
+    return value if len(value) <= max_length else None
+
+
+def _to_float(value):
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
 class Rental(Base):
     __tablename__ = "rentals"
 
@@ -16,6 +49,19 @@ class Rental(Base):
     rental_info = Column(Text)
     status = Column(String(20))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # 由 rental_info 同步的欄位，供 SQL 篩選使用（API 仍以 rental_info 寫入）
+    payment_frequency = Column(String(20), nullable=True, index=True)
+    early_checkin = Column(String(EARLY_CHECKIN_MAX_LENGTH), nullable=True)
+    initial_electric = Column(Float, nullable=True)
+
+    @validates("rental_info")
+    def _sync_rental_info_columns(self, key, value):
+        info = parse_rental_info(value)
+        money = info.get("money")
+        self.payment_frequency = money if money in PAYMENT_FREQUENCIES else None
+        self.early_checkin = _to_str(info.get("early_checkin"), EARLY_CHECKIN_MAX_LENGTH)
+        self.initial_electric = _to_float(info.get("initial_electric"))
+        return value
     
     def model_dump(self):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
@@ -27,4 +73,6 @@ class Rental(Base):
     
     accountings = relationship("Accounting", back_populates="rental")
     room = relationship("Room", back_populates="rentals")
+    # 繳費日期由資料庫的 ON DELETE CASCADE 隨租約刪除
+    payment_schedule = relationship("RentalPaymentSchedule", cascade="all, delete-orphan", passive_deletes=True)
     user = relationship("User", backref="rentals", foreign_keys=[user_id])  # 修改為明確的外鍵引用
\ No newline at end of file
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Date, DECIMAL, ForeignKey, Index
+from database import Base
+
+class RentalPaymentSchedule(Base):
+    """租約的繳費日期（依 rental_info 的繳費週期展開），於租約新增 / 更新時重新產生，退租時截斷"""
+    __tablename__ = "rental_payment_schedule"
+    __table_args__ = (
+        Index("uq_rental_payment_schedule_rental_due", "rental_id", "due_date", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    rental_id = Column(Integer, ForeignKey("rentals.id", ondelete="CASCADE"), nullable=False)
+    due_date = Column(Date, nullable=False, index=True)
+    # 租約資料目前沒有租金金額，保留欄位供之後填入
+    amount = Column(DECIMAL(10, 2), nullable=True)
+    # pending：待繳；其他狀態的資料重新產生時會保留
+    status = Column(String(20), nullable=False, server_default="pending")
@@ -1,52 +1,188 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, or_, and_
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
+import csv
+import io
+import tempfile
+from openpyxl import Workbook
 
-from database import get_db
-from schemas.accouting import Accounting, AccountingCreate, AccountingUpdate
+from database import get_db, SessionLocal
+from schemas.accouting import Accounting, AccountingCreate, AccountingUpdate, AccountingMonthlySummary
+from utils.auth import get_current_active_user
+from utils.accounting_summary import add_to_summary
+from models.auth import AuthUser
 import models
 
 router = APIRouter()
 
+# 匯出時每次從資料庫取回的列數
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ["id", "日期", "房號", "標題", "金額", "類別", "繳納方式", "租約ID", "記錄人"]
+
 # 根據物業ID獲取所有會計記錄
 @router.get("/estate/{estate_id}", response_model=List[Accounting])
 def get_estate_accounting(
     estate_id: int,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    accounting_tag: Optional[str] = None,
+    skip: int = 0,
+    limit: Optional[int] = Query(None, ge=1),
     db: Session = Depends(get_db)
 ):
-    # 先獲取該物業的所有房間
-    rooms = db.query(models.Room).filter(models.Room.estate_id == estate_id).all()
-    room_ids = [room.id for room in rooms]
-    
-    # 獲取這些房間的所有租約
-    rentals = db.query(models.Rental).filter(models.Rental.room_id.in_(room_ids)).all()
-    rental_ids = [rental.id for rental in rentals]
-    
-    # 查詢條件
-    query = db.query(models.Accounting).filter(models.Accounting.rental_id.in_(rental_ids))
+    # 單一查詢：會計記錄 → 租約 → 房間，直接帶出房號
+    stmt = _estate_accounting_filter(
+        select(models.Accounting, models.Room.room_number), estate_id, start_date, end_date, accounting_tag
+    ).order_by(models.Accounting.date.asc(), models.Accounting.id.asc())
+
+    if skip:
+        stmt = stmt.offset(skip)
+    if limit:
+        stmt = stmt.limit(limit)
+
+    accounting_records = []
+    for record, room_number in db.execute(stmt):
+        record.room_number = room_number
+        accounting_records.append(record)
     
-    # 如果提供了日期範圍，則進行過濾
+    return accounting_records
+
+def _estate_accounting_filter(
+    stmt,
+    estate_id: int,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    accounting_tag: Optional[str] = None
+):
+    """物業的會計記錄：租約房間屬於該物業，或未關聯租約但直接記在該物業"""
+    stmt = stmt.select_from(models.Accounting).outerjoin(
+        models.Rental, models.Rental.id == models.Accounting.rental_id
+    ).outerjoin(
+        models.Room, models.Room.id == models.Rental.room_id
+    ).where(
+        or_(
+            models.Room.estate_id == estate_id,
+            and_(models.Accounting.rental_id.is_(None), models.Accounting.estate_id == estate_id)
+        )
+    )
+
+    # 如果提供了日期範圍或類別，則進行過濾
     if start_date:
-        query = query.filter(models.Accounting.date >= start_date)
+        stmt = stmt.where(models.Accounting.date >= start_date)
     if end_date:
-        query = query.filter(models.Accounting.date <= end_date)
-    
-    # 排序並返回
-    accounting_records = query.order_by(models.Accounting.date.asc()).all()
-    
-    # 為每條記錄添加房間號
-    for record in accounting_records:
-        if record.rental_id:
-            rental = db.query(models.Rental).filter(models.Rental.id == record.rental_id).first()
-            if rental:
-                room = db.query(models.Room).filter(models.Room.id == rental.room_id).first()
-                if room:
-                    record.room_number = room.room_number
-    
-    return accounting_records
+        stmt = stmt.where(models.Accounting.date <= end_date)
+    if accounting_tag:
+        stmt = stmt.where(models.Accounting.accounting_tag == accounting_tag)
+    return stmt
+
+def _export_statement(estate_id: int, start_date: Optional[str], end_date: Optional[str]):
+    """匯出用的欄位查詢（不建立 ORM 物件）"""
+    stmt = _estate_accounting_filter(
+        select(
+            models.Accounting.id,
+            models.Accounting.date,
+            models.Room.room_number,
+            models.Accounting.title,
+            models.Accounting.income,
+            models.Accounting.accounting_tag,
+            models.Accounting.payment_method,
+            models.Accounting.rental_id,
+            models.Accounting.recorder_name
+        ),
+        estate_id, start_date, end_date
+    )
+
+    # stream_results 使用 server-side cursor，yield_per 控制每批取回的列數
+    return stmt.order_by(models.Accounting.date.asc(), models.Accounting.id.asc()).execution_options(
+        stream_results=True, yield_per=EXPORT_BATCH_SIZE
+    )
+
+
+def _iter_export_rows(stmt):
+    """逐批產生匯出資料；串流在相依性結束後才進行，因此自行開啟 session"""
+    db = SessionLocal()
+    db.use_replica = True
+    try:
+        for partition in db.execute(stmt).partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _csv_stream(stmt):
+    yield "\ufeff" + ",".join(EXPORT_COLUMNS) + "\r\n"  # BOM 讓 Excel 正確辨識 UTF-8
+    for partition in _iter_export_rows(stmt):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(partition)
+        yield buffer.getvalue()
+
+
+def _xlsx_stream(stmt):
+    # xlsx 為 zip 格式，須完整寫完才能輸出；write_only 模式逐列寫入暫存檔，記憶體不隨列數成長
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("accounting")
+    sheet.append(EXPORT_COLUMNS)
+    for partition in _iter_export_rows(stmt):
+        for row in partition:
+            sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while chunk := output.read(64 * 1024):
+            yield chunk
+
+
+# 匯出物業的會計記錄（CSV / XLSX 串流下載）
+@router.get("/estate/{estate_id}/export")
+def export_estate_accounting(
+    estate_id: int,
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    stmt = _export_statement(estate_id, start_date, end_date)
+    filename = f"accounting_{estate_id}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+    if format == "xlsx":
+        return StreamingResponse(
+            _xlsx_stream(stmt),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers=headers
+        )
+    return StreamingResponse(_csv_stream(stmt), media_type="text/csv; charset=utf-8", headers=headers)
+
+# 物業每月會計彙總（只讀取彙總表）
+@router.get("/accounting/estate/{estate_id}/summary", response_model=List[AccountingMonthlySummary])
+def get_estate_accounting_summary(
+    estate_id: int,
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    accounting_tag: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    query = db.query(models.AccountingMonthlySummary).filter(
+        models.AccountingMonthlySummary.estate_id == estate_id
+    )
+
+    if year:
+        query = query.filter(models.AccountingMonthlySummary.year == year)
+    if month:
+        query = query.filter(models.AccountingMonthlySummary.month == month)
+    if accounting_tag is not None:
+        query = query.filter(models.AccountingMonthlySummary.accounting_tag == accounting_tag)
+
+    return query.filter(models.AccountingMonthlySummary.count != 0).order_by(
+        models.AccountingMonthlySummary.year.asc(),
+        models.AccountingMonthlySummary.month.asc(),
+        models.AccountingMonthlySummary.accounting_tag.asc(),
+        models.AccountingMonthlySummary.payment_method.asc()
+    ).all()
 
 # 根據房間ID獲取租金記錄
 @router.get("/rent-payments/room/{room_id}", response_model=List[Accounting])
@@ -167,6 +303,7 @@ def create_payment(
     # 創建新記錄
     db_payment = models.Accounting(**payment.dict())
     db.add(db_payment)
+    add_to_summary(db, db_payment)
     db.commit()
     db.refresh(db_payment)
     
@@ -184,9 +321,11 @@ def update_payment(
     if not db_payment:
         raise HTTPException(status_code=404, detail="付款記錄不存在")
     
-    # 更新記錄
+    # 更新記錄（先扣除舊值的彙總，再加入新值）
+    add_to_summary(db, db_payment, -1)
     for key, value in payment_update.dict(exclude_unset=True).items():
         setattr(db_payment, key, value)
+    add_to_summary(db, db_payment)
     
     db.commit()
     db.refresh(db_payment)
@@ -205,6 +344,7 @@ def delete_payment(
         raise HTTPException(status_code=404, detail="付款記錄不存在")
     
     # 刪除記錄
+    add_to_summary(db, db_payment, -1)
     db.delete(db_payment)
     db.commit()
     
@@ -1,28 +1,53 @@
 # routes/auth.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from datetime import datetime, timezone,timedelta
 from typing import List
-from database import get_db
+from database import get_db, get_async_primary_db
 from models.auth import AuthUser
 from schemas.auth import AuthUserCreate, AuthUserUpdate, Token, TokenRefresh, AuthUser as AuthUserSchema
 from utils.auth import (
     SECRET_KEY,
     ALGORITHM,
-    verify_password,
+    verify_and_update_password,
     get_password_hash,
-    create_access_token,
-    create_refresh_token,
+    create_user_tokens,
     get_current_active_user,
-    ACCESS_TOKEN_EXPIRE_MINUTES,
-    REFRESH_TOKEN_EXPIRE_DAYS
+    get_current_full_user,
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    AUTH_STATELESS
 )
+from utils.principal_cache import invalidate_principal
+from utils.token_version import cache_token_version, forget_token_version
 
 tz = timezone(timedelta(hours=8))
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+def _security_fields(user: AuthUser) -> tuple:
+    """變更後須撤銷已簽發 access token 的欄位"""
+    return (user.email, user.role, user.is_active)
+
+def _forget_cached_version(user_id: int):
+    """
+    無狀態模式下撤銷前先刪除 Redis 中快取的版本
+
+    無法刪除（Redis 無法使用）時回傳 503 且不 commit，避免 Redis 恢復後仍信任舊版本
+    """
+    if AUTH_STATELESS and not forget_token_version(user_id):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token revocation is temporarily unavailable, please retry"
+        )
+
+def _revoke_tokens(user: AuthUser):
+    """在目前交易中遞增 token 版本（commit 後舊版本的 access token 全部失效）"""
+    _forget_cached_version(user.id)
+    user.token_version = AuthUser.token_version + 1
+
 @router.post("/register", response_model=AuthUserSchema)
 def register_user(
     user: AuthUserCreate, 
@@ -67,13 +92,18 @@ def register_user(
     return db_user
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(
+async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_primary_db)
 ):
 
-    user = db.query(AuthUser).filter(AuthUser.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    result = await db.execute(select(AuthUser).where(AuthUser.email == form_data.username))
+    user = result.scalars().first()
+    verified, new_hash = False, None
+    if user:
+        # bcrypt 在獨立的執行緒池中執行，不阻塞事件迴圈
+        verified, new_hash = await verify_and_update_password(form_data.password, user.password_hash)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -87,34 +117,15 @@ def login_for_access_token(
         )
     
 
-    user.last_login = datetime.now(tz)
-    db.commit()
-    
-
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={
-            "sub": user.email,
-            "role": user.role,
-            "name": user.name,
-            "id" : user.id 
-        }, 
-        expires_delta=access_token_expires
-    )
-    
+    # 成本設定變更時以新成本重新雜湊
+    if new_hash:
+        user.password_hash = new_hash
 
-    refresh_token = create_refresh_token(
-        data={
-            "sub": user.email,
-            "user_id": user.id
-        }
-    )
+    # last_login 與 password_hash 不在快取的 principal 中，登入不需清除快取
+    user.last_login = datetime.now(tz)
+    await db.commit()
     
-    return {
-        "access_token": access_token, 
-        "refresh_token": refresh_token,
-        "token_type": "bearer"
-    }
+    return create_user_tokens(user)
 
 @router.get("/users", response_model=List[AuthUserSchema])
 def get_users(
@@ -154,7 +165,7 @@ def get_user(
     return user
 
 @router.get("/me", response_model=AuthUserSchema)
-def read_current_user(current_user: AuthUser = Depends(get_current_active_user)):
+def read_current_user(current_user: AuthUser = Depends(get_current_full_user)):
     return current_user
 
 @router.put("/me", response_model=AuthUserSchema)
@@ -164,10 +175,18 @@ def update_user_info(
     db: Session = Depends(get_db)
 ):
     # 允許用戶更新自己的部分信息
+    # current_user 由驗證用的 async session 載入，需在本 session 中重新取得才能寫入
+    user = db.query(AuthUser).filter(AuthUser.id == current_user.id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    security_before = _security_fields(user)
     
     # 如果提供了密碼則更新
     if user_update.password:
-        current_user.password_hash = get_password_hash(user_update.password)
+        user.password_hash = get_password_hash(user_update.password)
     
     # 普通用戶可以更新的基本信息
     updatable_fields = [
@@ -184,18 +203,25 @@ def update_user_info(
     for field in updatable_fields:
         value = getattr(user_update, field)
         if value is not None:
-            setattr(current_user, field, value)
+            setattr(user, field, value)
     
     # 如果是管理員，還可以更新以下字段
     if current_user.role == "admin":
         for field in admin_fields:
             value = getattr(user_update, field)
             if value is not None:
-                setattr(current_user, field, value)
+                setattr(user, field, value)
+    
+    revoke = user_update.password or _security_fields(user) != security_before
+    if revoke:
+        _revoke_tokens(user)
     
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    invalidate_principal(user.id)
+    db.refresh(user)
+    if revoke:
+        cache_token_version(user.id, user.token_version)
+    return user
 
 @router.put("/users/{user_id}", response_model=AuthUserSchema)
 def update_user(
@@ -217,6 +243,7 @@ def update_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
+    security_before = _security_fields(user)
     
     # 如果提供了密碼則更新
     if user_update.password:
@@ -234,8 +261,16 @@ def update_user(
         if value is not None:
             setattr(user, field, value)
     
+    revoke = user_update.password or _security_fields(user) != security_before
+    if revoke:
+        _revoke_tokens(user)
+    
     db.commit()
+    # 包含停用（is_active=False），須立即失效
+    invalidate_principal(user.id)
     db.refresh(user)
+    if revoke:
+        cache_token_version(user.id, user.token_version)
     return user
 
 @router.delete("/users/{user_id}")
@@ -265,8 +300,11 @@ def delete_user(
             detail="User not found"
         )
     
+    _forget_cached_version(user_id)
     db.delete(user)
     db.commit()
+    invalidate_principal(user_id)
+    cache_token_version(user_id, None)
     return {"message": "User deleted successfully"}
 
 
@@ -293,30 +331,8 @@ def refresh_access_token(token_data: TokenRefresh, db: Session = Depends(get_db)
         if user is None or not user.is_active:
             raise credentials_exception
             
-        # 生成新的访问令牌
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={
-                "sub": user.email,
-                "role": user.role,
-                "name": user.name
-            }, 
-            expires_delta=access_token_expires
-        )
-        
-        # 可选：生成新的刷新令牌（轮换刷新令牌以提高安全性）
-        refresh_token = create_refresh_token(
-            data={
-                "sub": user.email,
-                "user_id": user.id
-            }
-        )
-        
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer"
-        }
+        # 生成新的访问令牌與刷新令牌（內容與登入相同，轮换刷新令牌以提高安全性）
+        return create_user_tokens(user)
         
     except JWTError:
         raise credentials_exception
@@ -1,11 +1,16 @@
 # cache_management.py
-from utils.redis_config import redis_client
+from utils.redis_config import redis_client, delete_pattern, invalidate_tags, scan_keys, codec_stats
+from utils.local_cache import local_cache
+from utils.cache_metrics import namespace_stats
+from utils.cache_warmup import get_warmup_status, start_cache_warmup
 import logging
 from fastapi import APIRouter, Depends
 from utils.auth import get_current_active_user
 from models.auth import AuthUser
 
 router = APIRouter(prefix="/cache", tags=["cache"])
+# 驗證用的鍵（token 版本、使用者快取）不隨清除全部快取刪除
+PRESERVED_PREFIXES = ("auth:",)
 
 @router.delete("/clear")
 def clear_all_cache(
@@ -16,8 +21,10 @@ def clear_all_cache(
         return {"status": "error", "message": "Admin privilege required"}
     
     try:
-        redis_client.flushdb()
-        return {"status": "success", "message": "All cache cleared successfully"}
+        deleted = delete_pattern("*", exclude_prefixes=PRESERVED_PREFIXES)
+        # 清除後在背景重新預熱熱門資料
+        start_cache_warmup()
+        return {"status": "success", "message": f"Cleared {deleted} cache entries, warm-up started"}
     except Exception as e:
         logging.error(f"Error clearing cache: {e}")
         return {"status": "error", "message": str(e)}
@@ -31,10 +38,8 @@ def clear_rentals_cache(
         return {"status": "error", "message": "Admin privilege required"}
     
     try:
-        keys = redis_client.keys("rentals:*")
-        if keys:
-            redis_client.delete(*keys)
-        return {"status": "success", "message": f"Cleared {len(keys)} cache entries"}
+        deleted = delete_pattern("rentals:*")
+        return {"status": "success", "message": f"Cleared {deleted} cache entries"}
     except Exception as e:
         logging.error(f"Error clearing rentals cache: {e}")
         return {"status": "error", "message": str(e)}
@@ -46,10 +51,8 @@ def clear_room_cache(
 ):
     """清除特定房間的快取"""
     try:
-        keys = redis_client.keys(f"rentals:room:{room_id}:*")
-        if keys:
-            redis_client.delete(*keys)
-        return {"status": "success", "message": f"Cleared {len(keys)} cache entries for room {room_id}"}
+        deleted = invalidate_tags(f"room:{room_id}")
+        return {"status": "success", "message": f"Cleared {deleted} cache entries for room {room_id}"}
     except Exception as e:
         logging.error(f"Error clearing room cache: {e}")
         return {"status": "error", "message": str(e)}
@@ -65,15 +68,46 @@ def get_cache_stats(
     try:
         info = redis_client.info()
         keys_count = redis_client.dbsize()
-        rental_keys = len(redis_client.keys("rentals:*"))
+        rental_keys = sum(1 for _ in scan_keys("rentals:*"))
         
         return {
             "status": "success",
             "total_keys": keys_count,
             "rental_keys": rental_keys,
             "memory_used": info.get("used_memory_human", "N/A"),
-            "uptime_days": info.get("uptime_in_days", "N/A")
+            "uptime_days": info.get("uptime_in_days", "N/A"),
+            # 處理此請求的 worker 的 L1 快取
+            "local_cache": local_cache.stats(),
+            # 快取值壓縮前後的累計大小
+            "codec": codec_stats(),
+            # 各命名空間的命中率、讀取延遲分位數（毫秒）與抽樣記憶體用量
+            "namespaces": namespace_stats(redis_client)
         }
     except Exception as e:
         logging.error(f"Error getting cache stats: {e}")
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
+
+@router.post("/warmup")
+def trigger_cache_warmup(
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """在背景執行快取預熱"""
+    if current_user.role != "admin":
+        return {"status": "error", "message": "Admin privilege required"}
+
+    start_cache_warmup()
+    return {"status": "success", "message": "Cache warm-up started"}
+
+@router.get("/warmup")
+def get_cache_warmup_status(
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """最近一次快取預熱的進度與耗時"""
+    if current_user.role != "admin":
+        return {"status": "error", "message": "Admin privilege required"}
+
+    try:
+        return {"status": "success", "warmup": get_warmup_status()}
+    except Exception as e:
+        logging.error(f"Error getting cache warm-up status: {e}")
+        return {"status": "error", "message": str(e)}
@@ -0,0 +1,44 @@
+# db_management.py
+from utils.db_pool import get_pool_stats
+from utils.slow_query import get_slow_queries
+import logging
+from fastapi import APIRouter, Depends, Query
+from utils.auth import get_current_active_user
+from models.auth import AuthUser
+
+router = APIRouter(prefix="/db", tags=["database"])
+
+@router.get("/pool")
+def get_db_pool_stats(
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """獲取本 worker 的資料庫連接池統計資訊"""
+    if current_user.role != "admin":
+        return {"status": "error", "message": "Admin privilege required"}
+
+    try:
+        return {
+            "status": "success",
+            "pools": get_pool_stats()
+        }
+    except Exception as e:
+        logging.error(f"Error getting db pool stats: {e}")
+        return {"status": "error", "message": str(e)}
+
+@router.get("/slow-queries")
+def get_db_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """獲取本 worker 最近的慢查詢紀錄"""
+    if current_user.role != "admin":
+        return {"status": "error", "message": "Admin privilege required"}
+
+    try:
+        return {
+            "status": "success",
+            "slow_queries": get_slow_queries(limit)
+        }
+    except Exception as e:
+        logging.error(f"Error getting slow queries: {e}")
+        return {"status": "error", "message": str(e)}
@@ -1,15 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from datetime import datetime
 
 from database import get_db
-from schemas.electric_record import ElectricRecord, ElectricRecordCreate, ElectricRecordUpdate
+from schemas.electric_record import (
+    ElectricRecord, ElectricRecordCreate, ElectricRecordUpdate, ElectricRecordUpsert,
+    ElectricRecordBulkCreate, ElectricRecordBulkResult, ElectricRecordBulkResponse
+)
+from utils.accounting_summary import add_to_summary
+from utils.electric_record import upsert_electric_record, bulk_upsert_electric_records, previous_readings, period_index
 from schemas.accouting import AccountingCreate
 import models
 
 router = APIRouter()
 
+# 批次寫入電表讀數的單次上限
+ELECTRIC_BULK_MAX_ROWS = 1000
+
 # 根據房間ID獲取電表記錄
 @router.get("/electric-records/room/{room_id}", response_model=List[ElectricRecord])
 def get_room_electric_records(
@@ -119,6 +128,7 @@ def create_electricity_payment(
     accounting_record.accounting_tag = "電費"  # 確保標記為電費
     
     db.add(accounting_record)
+    add_to_summary(db, accounting_record)
     db.commit()
     db.refresh(accounting_record)
     
@@ -135,24 +145,126 @@ def create_electric_record(
     if not room:
         raise HTTPException(status_code=404, detail="房間不存在")
     
-    # 檢查是否已存在相同年月的記錄
-    existing_record = db.query(models.ElectricRecord).filter(
-        models.ElectricRecord.room_id == record.room_id,
-        models.ElectricRecord.record_year == record.record_year,
-        models.ElectricRecord.record_month == record.record_month
-    ).first()
-    
-    if existing_record:
-        raise HTTPException(status_code=400, detail="該年月已有電表記錄")
-    
-    # 創建新記錄
+    # 創建新記錄（同房同年月由唯一索引擋下，不再先查後寫）
     db_record = models.ElectricRecord(**record.dict())
     db.add(db_record)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="該年月已有電表記錄")
     db.refresh(db_record)
     
     return db_record
 
+# 寫入（新增或覆蓋）某房間某年月的電表讀數
+@router.put("/electric-records/room/{room_id}/{year}/{month}", response_model=ElectricRecord)
+def upsert_room_electric_record(
+    room_id: int,
+    year: int,
+    month: int,
+    record: ElectricRecordUpsert,
+    db: Session = Depends(get_db)
+):
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="月份必須介於 1 到 12")
+
+    # 檢查房間是否存在
+    room = db.query(models.Room).filter(models.Room.id == room_id).first()
+    if not room:
+        raise HTTPException(status_code=404, detail="房間不存在")
+
+    db_record = upsert_electric_record(db, room_id, year, month, record.reading, record.recorder_id)
+    db.commit()
+
+    return db_record
+
+# 批次寫入整個物業的電表讀數（逐筆回傳結果）
+@router.post("/electric-records/bulk", response_model=ElectricRecordBulkResponse)
+def bulk_create_electric_records(
+    payload: ElectricRecordBulkCreate,
+    db: Session = Depends(get_db)
+):
+    if len(payload.records) > ELECTRIC_BULK_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"單次最多 {ELECTRIC_BULK_MAX_ROWS} 筆")
+
+    results = [
+        ElectricRecordBulkResult(
+            room_id=item.room_id, year=item.year, month=item.month, reading=item.reading, status="saved"
+        )
+        for item in payload.records
+    ]
+
+    def reject(result: ElectricRecordBulkResult, detail: str):
+        result.status = "rejected"
+        result.detail = detail
+
+    # 1. 以單一查詢確認房間屬於該物業
+    room_ids = {item.room_id for item in payload.records}
+    estate_room_ids = {
+        room_id for (room_id,) in db.query(models.Room.id).filter(
+            models.Room.estate_id == payload.estate_id,
+            models.Room.id.in_(room_ids)
+        )
+    } if room_ids else set()
+
+    seen = set()
+    for result in results:
+        key = (result.room_id, result.year, result.month)
+        if not 1 <= result.month <= 12:
+            reject(result, "月份必須介於 1 到 12")
+        elif result.room_id not in estate_room_ids:
+            reject(result, "房間不屬於此物業")
+        elif key in seen:
+            reject(result, "同一批次中重複的房間與年月")
+        else:
+            seen.add(key)
+
+    # 2. 取得各房間前一筆讀數（每個年月一次查詢，整個物業同月抄表時只有一次）
+    pending = sorted(
+        (result for result in results if result.status == "saved"),
+        key=lambda result: period_index(result.year, result.month)
+    )
+    previous_by_period = {}
+    for year, month in {(result.year, result.month) for result in pending}:
+        period_room_ids = [result.room_id for result in pending if (result.year, result.month) == (year, month)]
+        previous_by_period[(year, month)] = previous_readings(db, period_room_ids, year, month)
+
+    # 同一批次中較早月份的讀數也算前一筆
+    batch_latest = {}
+    rows = []
+    for result in pending:
+        candidates = [
+            previous_by_period[(result.year, result.month)].get(result.room_id),
+            batch_latest.get(result.room_id)
+        ]
+        candidates = [candidate for candidate in candidates if candidate is not None]
+        if candidates:
+            result.previous_reading = max(candidates)[1]
+            if result.reading < result.previous_reading:
+                reject(result, "讀數小於前一筆記錄")
+                continue
+
+        batch_latest[result.room_id] = (period_index(result.year, result.month), result.reading)
+        rows.append({
+            "room_id": result.room_id,
+            "record_year": result.year,
+            "record_month": result.month,
+            "reading": result.reading,
+            "recorder_id": payload.recorder_id,
+        })
+
+    # 3. 以單一批次 upsert 寫入
+    record_ids = bulk_upsert_electric_records(db, rows)
+    db.commit()
+
+    for result in results:
+        if result.status == "saved":
+            result.record_id = record_ids.get((result.room_id, result.year, result.month))
+
+    saved = sum(1 for result in results if result.status == "saved")
+    return ElectricRecordBulkResponse(saved=saved, rejected=len(results) - saved, results=results)
+
 # 更新電表讀數記錄
 @router.put("/electric-records/{record_id}", response_model=ElectricRecord)
 def update_electric_record(
@@ -169,7 +281,11 @@ def update_electric_record(
     for key, value in record_update.dict(exclude_unset=True).items():
         setattr(db_record, key, value)
     
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="該年月已有電表記錄")
     db.refresh(db_record)
     
     return db_record
@@ -1,23 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from database import get_db
 from models.estate import Estate
 from schemas.estate import EstateCreate, EstateUpdate, Estate as EstateSchema
 from utils.auth import get_current_active_user
 from models.auth import AuthUser
+from utils.pagination import SortKey, apply_keyset, set_next_cursor
 
 router = APIRouter(prefix="/estates", tags=["estates"])
 
 @router.get("/", response_model=List[EstateSchema])
 def get_estates(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
-
-    estates = db.query(Estate).offset(skip).limit(limit).all()
+    # 提供 cursor 時使用 keyset 分頁，否則沿用 skip/limit
+    keys = [SortKey(Estate.id)]
+    estates = apply_keyset(db.query(Estate), keys, cursor, skip).limit(limit).all()
+    set_next_cursor(response, estates, keys, limit)
     return estates
 
 @router.post("/", response_model=EstateSchema)
@@ -1,9 +1,10 @@
 # file.py - 完整的 API 路由更新
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File as FastAPIFile, Form, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File as FastAPIFile, Form, BackgroundTasks, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database import get_db
+from database import get_db, get_async_db, SessionLocal
 from models.file import Files as File
 from schemas.file import FileCreate, FileUpdate, FileResponse, FileUploadInfo, FileSortUpdateRequest
 from utils.auth import get_current_active_user
@@ -12,6 +13,7 @@ from datetime import datetime, timezone, timedelta
 from utils.cloudstorage import StorageService
 import json
 from utils.validators import validate_file_type, validate_file_size
+from utils.pagination import SortKey, apply_keyset, set_next_cursor
 
 router = APIRouter(prefix="/files", tags=["files"])
 tz = timezone(timedelta(hours=8))
@@ -39,34 +41,47 @@ def refresh_expired_urls(db: Session):
     
     db.commit()
 
+def refresh_expired_urls_task():
+    """以獨立的 session 執行 URL 刷新，供背景任務使用"""
+    db = SessionLocal()
+    try:
+        refresh_expired_urls(db)
+    finally:
+        db.close()
+
 @router.get("/", response_model=List[FileResponse])
-def get_files(
+async def get_files(
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
+    cursor: Optional[str] = None,
     category: Optional[str] = None,
     ref_id: Optional[int] = None,
     file_type: Optional[str] = None,
     background_tasks: BackgroundTasks = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
     """獲取檔案列表，支持過濾條件，按排序順序返回"""
-    query = db.query(File)
+    query = select(File)
     
     # 應用過濾條件
     if category:
-        query = query.filter(File.category == category)
+        query = query.where(File.category == category)
     if ref_id is not None:
-        query = query.filter(File.ref_id == ref_id)
+        query = query.where(File.ref_id == ref_id)
     if file_type:
-        query = query.filter(File.file_type == file_type)
+        query = query.where(File.file_type == file_type)
     
-    # 排序：首先按 sort_order，然後按上傳時間
-    files = query.order_by(File.sort_order.asc(), File.upload_time.desc()).offset(skip).limit(limit).all()
+    # 排序：首先按 sort_order，然後按上傳時間；提供 cursor 時使用 keyset 分頁
+    keys = [SortKey(File.sort_order), SortKey(File.upload_time, descending=True), SortKey(File.id)]
+    result = await db.execute(apply_keyset(query, keys, cursor, skip).limit(limit))
+    files = result.scalars().all()
+    set_next_cursor(response, files, keys, limit)
     
     # 背景刷新即將過期的 URL
     if background_tasks:
-        background_tasks.add_task(refresh_expired_urls, db)
+        background_tasks.add_task(refresh_expired_urls_task)
         
     return files
 
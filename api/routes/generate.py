@@ -8,7 +8,7 @@ import uuid
 from docxtpl import DocxTemplate
 from pydantic import BaseModel
 
-from database import get_db
+from database import get_db, get_replica_db
 from models.room import Room
 from models.rental import Rental
 from models.users import User
@@ -107,7 +107,7 @@ async def generate_receipt(
 async def generate_report(
     data: ReportData,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_replica_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
     """生成電費總表"""
@@ -0,0 +1,197 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File as FastAPIFile, Form, BackgroundTasks, Query
+from fastapi.responses import FileResponse
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+import csv
+import os
+import shutil
+import uuid
+import logging
+import pandas as pd
+
+from database import get_db
+from models.room import Room
+from models.rental import Rental
+from models.accouting import Accounting
+from models.auth import AuthUser
+from utils.auth import get_current_active_user
+from utils.electric_record import bulk_upsert_electric_records
+from utils.accounting_summary import add_rows_to_summary
+from utils.spreadsheet_import import (
+    IMPORT_CHUNK_SIZE, ELECTRIC_COLUMNS, ELECTRIC_REQUIRED, PAYMENT_COLUMNS, PAYMENT_REQUIRED,
+    ROW_COLUMN, ERROR_COLUMN, SPREADSHEET_ERRORS, CHUNK_READ_ERRORS,
+    iter_chunks, validate_electric_chunk, validate_payment_chunk
+)
+from routes.generate import TEMP_DIR, cleanup_temp_file
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+ALLOWED_EXTENSIONS = (".csv", ".xlsx")
+IMPORT_KINDS = {
+    "electric-records": (ELECTRIC_COLUMNS, ELECTRIC_REQUIRED),
+    "payments": (PAYMENT_COLUMNS, PAYMENT_REQUIRED),
+}
+
+
+def _estate_rentals(db: Session, estate_id: int) -> pd.DataFrame:
+    """該物業所有租約（依起租日排序），供 merge_asof 對應繳費日期"""
+    rows = db.query(Rental.id, Rental.room_id, Rental.start_date).join(
+        Room, Room.id == Rental.room_id
+    ).filter(
+        Room.estate_id == estate_id,
+        Rental.start_date.isnot(None)
+    ).all()
+    rentals = pd.DataFrame(rows, columns=["rental_id", "room_id", "start_date"])
+    rentals["room_id"] = rentals["room_id"].astype("int64")
+    rentals["start_date"] = pd.to_datetime(rentals["start_date"])
+    return rentals.sort_values("start_date")
+
+
+def _write_electric(db: Session, frame: pd.DataFrame, recorder_id: int) -> int:
+    rows = [
+        {
+            "room_id": int(row.room_id),
+            "record_year": int(row.year),
+            "record_month": int(row.month),
+            "reading": float(row.reading),
+            "recorder_id": recorder_id,
+        }
+        for row in frame.itertuples(index=False)
+    ]
+    bulk_upsert_electric_records(db, rows)
+    return len(rows)
+
+
+def _write_payments(db: Session, frame: pd.DataFrame, estate_id: int, current_user: AuthUser) -> int:
+    rows = [
+        {
+            "title": row.title,
+            "income": float(row.income),
+            "date": row.date.to_pydatetime(),
+            "estate_id": estate_id,
+            "rental_id": int(row.rental_id),
+            "accounting_tag": row.accounting_tag,
+            "payment_method": row.payment_method,
+            "recorder_id": current_user.id,
+            "recorder_name": current_user.name,
+        }
+        for row in frame.itertuples(index=False)
+    ]
+    if rows:
+        db.execute(insert(Accounting), rows)
+        add_rows_to_summary(db, rows)
+    return len(rows)
+
+
+@router.post("/{kind}")
+def import_spreadsheet(
+    kind: str,
+    background_tasks: BackgroundTasks,
+    estate_id: int = Form(...),
+    file: UploadFile = FastAPIFile(...),
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """
+    匯入電表讀數（electric-records）或繳費紀錄（payments）的 CSV / XLSX
+
+    以串流方式逐批讀取，每 chunk_size 列一個交易寫入；回傳錯誤報表 CSV，
+    匯入筆數放在 X-Import-Total / X-Import-Imported / X-Import-Rejected 標頭
+    """
+    if kind not in IMPORT_KINDS:
+        raise HTTPException(status_code=404, detail="不支援的匯入類型")
+    filename = file.filename or ""
+    if not filename.lower().endswith(ALLOWED_EXTENSIONS):
+        raise HTTPException(status_code=400, detail="只支援 CSV 或 XLSX 檔案")
+
+    # 先將上傳內容串流寫入暫存檔，避免整份讀入記憶體
+    token = uuid.uuid4().hex
+    upload_path = os.path.join(TEMP_DIR, f"import_{token}{os.path.splitext(filename)[1].lower()}")
+    report_path = os.path.join(TEMP_DIR, f"import_{token}_errors.csv")
+    with open(upload_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+
+    spec, required = IMPORT_KINDS[kind]
+    chunks = iter_chunks(upload_path, filename, spec, required, chunk_size)
+    total = imported = 0
+    completed = False
+    try:
+        # 只有表頭與第一批讀取失敗時回傳 400，此時尚未寫入任何資料
+        try:
+            chunk = next(chunks, None)
+        except SPREADSHEET_ERRORS as e:
+            logging.warning(f"Import file could not be read: {e!r}")
+            raise HTTPException(status_code=400, detail=str(e) or "無法讀取檔案")
+
+        room_map = {
+            room_number.strip(): room_id
+            for room_id, room_number in db.query(Room.id, Room.room_number).filter(
+                Room.estate_id == estate_id,
+                Room.deleted_at.is_(None)
+            )
+        }
+        rentals = _estate_rentals(db, estate_id) if kind == "payments" else None
+
+        with open(report_path, "w", newline="", encoding="utf-8-sig") as report_file:
+            report = csv.writer(report_file)
+            report.writerow(["row", *spec.keys(), "error"])
+
+            last_row = 1
+            while chunk is not None:
+                if kind == "electric-records":
+                    frame = validate_electric_chunk(chunk, room_map)
+                else:
+                    frame = validate_payment_chunk(chunk, room_map, rentals)
+
+                valid = frame[frame[ERROR_COLUMN] == ""]
+                try:
+                    if kind == "electric-records":
+                        written = _write_electric(db, valid, current_user.id)
+                    else:
+                        written = _write_payments(db, valid, estate_id, current_user)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    logging.error(f"Import chunk failed: {e}")
+                    written = 0
+                    frame.loc[valid.index, ERROR_COLUMN] = f"寫入失敗: {e}"
+
+                total += len(frame)
+                imported += written
+                if len(chunk):
+                    last_row = int(chunk[ROW_COLUMN].max())
+                invalid = frame[frame[ERROR_COLUMN] != ""]
+                failed = chunk.loc[invalid.index]
+                for row_number, values, error in zip(
+                    failed[ROW_COLUMN], failed[list(spec.keys())].itertuples(index=False), invalid[ERROR_COLUMN]
+                ):
+                    report.writerow([row_number, *["" if pd.isna(v) else v for v in values], error])
+
+                try:
+                    chunk = next(chunks, None)
+                except CHUNK_READ_ERRORS as e:
+                    # 先前的批次已提交，停止匯入並在報表註明，使用者只需重新上傳之後的列
+                    logging.warning(f"Import stopped after row {last_row}: {e!r}")
+                    report.writerow(["", *[""] * len(spec), f"第 {last_row} 列之後無法讀取，匯入已中止: {e}"])
+                    break
+        completed = True
+    finally:
+        chunks.close()
+        os.unlink(upload_path)
+        # 失敗時報表不會回傳，直接刪除
+        if not completed and os.path.exists(report_path):
+            os.unlink(report_path)
+
+    background_tasks.add_task(cleanup_temp_file, report_path, 300)  # 5分鐘後刪除
+
+    return FileResponse(
+        path=report_path,
+        filename=f"import_errors_{kind}.csv",
+        media_type="text/csv",
+        headers={
+            "X-Import-Total": str(total),
+            "X-Import-Imported": str(imported),
+            "X-Import-Rejected": str(total - imported),
+        }
+    )
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session, joinedload
 from fastapi.params import Query
-from typing import List
+from typing import List, Optional
 from database import get_db
 from models.leave_application import LeaveApplication, LeaveType
 from schemas.leave_application import (
@@ -9,6 +9,7 @@ from schemas.leave_application import (
     LeaveTypeCreate, LeaveTypeUpdate, LeaveType as LeaveTypeSchema
 )
 from utils.auth import get_current_active_user
+from utils.pagination import SortKey, apply_keyset, set_next_cursor
 from datetime import datetime, timezone, timedelta
 from models.auth import AuthUser
 import re
@@ -111,8 +112,10 @@ def create_leave_application(
 
 @router.get("/", response_model=List[LeaveApplicationSchema])
 def read_leave_applications(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     status: str = Query(None, description="Filter by status"),
     leave_type_id: int = Query(None, description="Filter by leave type"),
     start_date: str = Query(None, description="Filter from date (YYYY-MM-DD)"),
@@ -141,7 +144,10 @@ def read_leave_applications(
     if end_date:
         query = query.filter(LeaveApplication.end_date <= end_date)
     
-    leave_applications = query.offset(skip).limit(limit).all()
+    # 提供 cursor 時使用 keyset 分頁，否則沿用 skip/limit
+    keys = [SortKey(LeaveApplication.id)]
+    leave_applications = apply_keyset(query, keys, cursor, skip).limit(limit).all()
+    set_next_cursor(response, leave_applications, keys, limit)
     return leave_applications
 
 @router.get("/me", response_model=List[LeaveApplicationSchema])
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from datetime import datetime, timezone, timedelta, date
@@ -12,6 +12,7 @@ from schemas.meeting_reservation import (
     MeetingReservationSimple
 )
 from utils.auth import get_current_active_user
+from utils.pagination import SortKey, apply_keyset, set_next_cursor
 from models.auth import AuthUser
 from typing import List, Optional
 
@@ -42,11 +43,13 @@ def check_time_conflict(db: Session, room_id: int, start_time: datetime, end_tim
 
 @router.get("/", response_model=List[MeetingReservationResponse])
 def get_reservations(
+    response: Response,
     start_date: Optional[date] = Query(None, description="開始日期篩選 (YYYY-MM-DD)"),
     end_date: Optional[date] = Query(None, description="結束日期篩選 (YYYY-MM-DD)"),
     room_id: Optional[int] = Query(None, description="會議室ID篩選"),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
@@ -66,7 +69,10 @@ def get_reservations(
     if room_id:
         query = query.filter(MeetingReservation.room_id == room_id)
     
-    reservations = query.offset(skip).limit(limit).all()
+    # 提供 cursor 時使用 keyset 分頁，否則沿用 skip/limit
+    keys = [SortKey(MeetingReservation.start_time), SortKey(MeetingReservation.id)]
+    reservations = apply_keyset(query, keys, cursor, skip).limit(limit).all()
+    set_next_cursor(response, reservations, keys, limit)
     return reservations
 
 @router.post("/", response_model=MeetingReservationResponse)
@@ -1,24 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from database import get_db
+from database import get_db, get_primary_db, get_async_primary_db
 from models.rental import Rental
 from models.users import User
 from models.room import Room
 from models.electric_record import ElectricRecord
+from models.rental_payment_schedule import RentalPaymentSchedule
 from models.accouting import Accounting
 from schemas.users import UserCreate, User as UserSchema
-from schemas.rental import RentalCreate, RentalUpdate, Rental as RentalSchema, RentalInfoDetails, RentalResponse
+from schemas.rental import RentalCreate, RentalUpdate, Rental as RentalSchema, UpcomingPayment
 from models.checkout_record import CheckoutRecord
 from schemas.checkout import CheckoutRequest, CheckoutResponse, CheckoutRecord as CheckoutRecordSchema
 from utils.auth import get_current_active_user
+from utils.electric_record import upsert_electric_record
+from utils.accounting_summary import add_to_summary
+from utils.payment_schedule import schedule_changed, sync_payment_schedule, truncate_payment_schedule, upcoming_dates
 from models.auth import AuthUser
 from pydantic import BaseModel
 from datetime import datetime, timedelta, timezone, date
 import logging
-from dateutil.relativedelta import relativedelta
-from utils.redis_config import get_cache, set_cache, delete_cache, delete_pattern
-import json
+from utils.redis_config import cached
+from utils.pagination import SortKey, apply_keyset, set_next_cursor
 
 router = APIRouter(prefix="/rentals", tags=["rentals"])
 tz = timezone(timedelta(hours=8))
@@ -33,46 +38,28 @@ class RentalWithTenantSchema(BaseModel):
     tenant: UserCreate
 
 @router.get("/room/{room_id}/status/{status}", response_model=List[RentalSchema])
-def get_rentals_by_room_status(
+@cached(
+    "rentals:room:{room_id}:status:{status}",
+    response_model=List[RentalSchema],
+    ttl=3600,
+    tags=["room:{room_id}"],
+    stale_ttl=300
+)
+async def get_rentals_by_room_status(
     room_id: int, 
     status: int,
-    db: Session = Depends(get_db),
+    # 結果會寫入快取，讀 primary 以免把 replica 延遲的資料快取一小時
+    db: AsyncSession = Depends(get_async_primary_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
-    # 定義快取金鑰
-    cache_key = f"rentals:room:{room_id}:status:{status}"
-    
-    # 嘗試從快取獲取資料
-    cached_data = get_cache(cache_key)
-    if cached_data:
-        logging.info(f"Cache hit for {cache_key}")
-        # 將快取的字典數據轉換為Pydantic模型
-        return [RentalSchema(**item) for item in cached_data]
-    
-    # 快取未命中，從資料庫獲取資料
-    logging.info(f"Cache miss for {cache_key}, querying database")
     status_str = "active" if status == 1 else "inactive"
-    rentals = db.query(Rental).filter(Rental.room_id == room_id, Rental.status == status_str).all()
-    
-    # 將ORM對象轉換為可序列化字典
-    serializable_rentals = []
-    for rental in rentals:
-        rental_dict = {c.name: getattr(rental, c.name) for c in rental.__table__.columns}
-        # 處理日期/時間類型
-        for key, value in rental_dict.items():
-            if isinstance(value, (datetime, date)):
-                rental_dict[key] = value.isoformat()
-        serializable_rentals.append(rental_dict)
-    
-    # 存入快取（設定1小時過期）
-    set_cache(cache_key, serializable_rentals, 3600)
-    
-    return rentals
+    result = await db.execute(select(Rental).where(Rental.room_id == room_id, Rental.status == status_str))
+    return result.scalars().all()
 
 @router.post("/", response_model=RentalWithTenantSchema)
 def create_rental(
     data: RentalWithTenantCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_primary_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
     rental_data = data.rental.model_dump()
@@ -93,20 +80,44 @@ def create_rental(
 
     db_rental = Rental(**rental_data)
     db.add(db_rental)
+    db.flush()
+    sync_payment_schedule(db, [db_rental])
 
     db.commit()
 
     db.refresh(db_rental)
     db.refresh(db_user)
     
-    # 刪除相關的快取
-    delete_pattern(f"rentals:room:{rental_data['room_id']}:*")
-    
     return{
         "rental" : db_rental,
         "tenant" : db_user
     }
 
+@router.get("/", response_model=List[RentalSchema])
+def get_rentals(
+    response: Response,
+    payment_frequency: Optional[str] = None,
+    estate_id: Optional[int] = None,
+    status: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """依繳費週期、物業與狀態篩選租約（例如某物業所有季繳的有效租約），條件都在 SQL 中處理；以 cursor 分頁"""
+    query = db.query(Rental)
+    if payment_frequency:
+        query = query.filter(Rental.payment_frequency == payment_frequency)
+    if estate_id is not None:
+        query = query.join(Room, Room.id == Rental.room_id).filter(Room.estate_id == estate_id)
+    if status:
+        query = query.filter(Rental.status == status)
+    keys = [SortKey(Rental.id)]
+    rentals = apply_keyset(query, keys, cursor, skip).limit(limit).all()
+    set_next_cursor(response, rentals, keys, limit)
+    return rentals
+
 @router.get("/{rental_id}", response_model=RentalSchema)
 def get_rental(
     rental_id: int, 
@@ -132,14 +143,13 @@ def update_rental(
     update_data = rental_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_rental, field, value)
+    # 只有影響繳費日期的欄位變更時才重新產生（未變更的 PUT 不刪除重建待繳日期）
+    if schedule_changed(db_rental):
+        sync_payment_schedule(db, [db_rental])
     
     db.commit()
     db.refresh(db_rental)
     
-    # 清除與此租約相關的所有快取
-    delete_pattern(f"rentals:room:{db_rental.room_id}:*")
-    delete_pattern(f"rentals:payment_info:{rental_id}")
-    
     return db_rental
 
 @router.delete("/{rental_id}")
@@ -152,80 +162,74 @@ def delete_rental(
     if db_rental is None:
         raise HTTPException(status_code=404, detail="Rental not found")
     
-    room_id = db_rental.room_id  # 在刪除前保存room_id
-    
     db.delete(db_rental)
     db.commit()
     
-    # 清除與此租約相關的所有快取
-    delete_pattern(f"rentals:room:{room_id}:*")
-    delete_pattern(f"rentals:payment_info:{rental_id}")
-    
     return {"message": "Rental deleted successfully"}
 
 @router.get("/payment_info/{rental_id}", response_model=List[date])
+@cached(
+    "rentals:payment_info:{rental_id}",
+    response_model=List[date],
+    ttl=86400,  # 24小時
+    tags=["rental:{rental_id}"]
+)
 def get_payment_info_by_rental_id(
     rental_id: int,
-    db: Session = Depends(get_db),
+    # 結果會寫入快取，讀 primary 以免把 replica 延遲的資料快取
+    db: Session = Depends(get_primary_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
-    # 定義快取金鑰
-    cache_key = f"rentals:payment_info:{rental_id}"
-    
-    # 嘗試從快取獲取資料
-    cached_data = get_cache(cache_key)
-    if cached_data:
-        logging.info(f"Cache hit for {cache_key}")
-        # 將快取的ISO日期格式轉回date對象
-        return [date.fromisoformat(d) for d in cached_data]
-    
-    # 快取未命中，從資料庫獲取資料
-    logging.info(f"Cache miss for {cache_key}, calculating payment dates")
-    
-    rental = db.query(Rental).filter(Rental.id == rental_id).first()
-    if rental is None:
+    dates = upcoming_dates(db, [rental_id])[rental_id]
+    if not dates and db.query(Rental.id).filter(Rental.id == rental_id).first() is None:
         raise HTTPException(status_code=404, detail="Rental not found")
-    
-    response = RentalResponse.model_validate(rental, from_attributes=True)
-    rental_info = response.get_rental_info_details()
-    payment_freq = rental_info.money
+    return dates
 
-    next_dates = []
-    current_date = datetime.now().date()
-    
-    interval = None
-    if payment_freq == "月繳":
-        interval = relativedelta(months=1)
-    elif payment_freq == "季繳":
-        interval = relativedelta(months=3)
-    elif payment_freq == "半年":
-        interval = relativedelta(months=6)
-    elif payment_freq == "年繳":
-        interval = relativedelta(years=1)
-    else:
-        return []  
-    
-    next_payment = response.start_date
-    
-    while next_payment <= response.end_date:
-        if next_payment >= current_date:
-            next_dates.append(next_payment)
-        next_payment += interval
-    
-    # 將日期轉換為可序列化的ISO格式字符串
-    serializable_dates = [d.isoformat() for d in next_dates]
-    
-    # 存入快取（設定24小時過期）
-    set_cache(cache_key, serializable_dates, 86400)  # 24小時 = 86400秒
-    
-    return next_dates
+
+@router.get("/payments/upcoming", response_model=List[UpcomingPayment])
+def get_upcoming_payments(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    estate_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    """期間內（預設今天起 7 天）所有有效租約的繳費日期，以 due_date 索引做一次範圍查詢"""
+    from_date = from_date or datetime.now().date()
+    to_date = to_date or from_date + timedelta(days=7)
+    if to_date < from_date:
+        raise HTTPException(status_code=400, detail="to 不可早於 from")
+
+    stmt = (
+        select(
+            RentalPaymentSchedule.rental_id,
+            Rental.room_id,
+            Room.room_number,
+            Room.estate_id,
+            User.name.label("tenant_name"),
+            RentalPaymentSchedule.due_date,
+            RentalPaymentSchedule.amount,
+            RentalPaymentSchedule.status
+        )
+        .join(Rental, Rental.id == RentalPaymentSchedule.rental_id)
+        .join(Room, Room.id == Rental.room_id)
+        .outerjoin(User, User.id == Rental.user_id)
+        .where(
+            RentalPaymentSchedule.due_date.between(from_date, to_date),
+            Rental.status == "active"
+        )
+        .order_by(RentalPaymentSchedule.due_date, Rental.room_id)
+    )
+    if estate_id is not None:
+        stmt = stmt.where(Room.estate_id == estate_id)
+    return db.execute(stmt).all()
 
 
 @router.post("/checkout/{rental_id}", response_model=CheckoutResponse)
 def checkout_rental(
     rental_id: int,
     checkout_data: CheckoutRequest,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_primary_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
     """執行退租流程"""
@@ -263,6 +267,7 @@ def checkout_rental(
         # 4. 更新租約狀態為 inactive
         rental.status = "inactive"
         rental.end_date = checkout_data.checkout_date.date()
+        truncate_payment_schedule(db, rental_id, rental.end_date)
         
         # 5. 新增最終電錶記錄
         electric_record = None
@@ -270,15 +275,15 @@ def checkout_rental(
             checkout_month = checkout_data.checkout_date.month
             checkout_year = checkout_data.checkout_date.year
             
-            electric_record = ElectricRecord(
+            # 當月已有讀數時以最終讀數覆蓋
+            electric_record = upsert_electric_record(
+                db,
                 room_id=rental.room_id,
-                reading=checkout_data.final_electric_reading,
                 record_year=checkout_year,
                 record_month=checkout_month,
+                reading=checkout_data.final_electric_reading,
                 recorder_id=current_user.id
             )
-            db.add(electric_record)
-            db.flush()  # 取得 ID
         
         # 6. 新增結算會計記錄
         accounting_record = None
@@ -301,14 +306,11 @@ def checkout_rental(
             )
             db.add(accounting_record)
             db.flush()  # 取得 ID
+            add_to_summary(db, accounting_record)
         
         # 7. 提交所有變更
         db.commit()
         
-        # 8. 清除相關快取
-        delete_pattern(f"rentals:room:{rental.room_id}:*")
-        delete_pattern(f"rentals:payment_info:{rental_id}")
-        
         return CheckoutResponse(
             success=True,
             message="退租完成",
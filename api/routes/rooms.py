@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import datetime, timezone, timedelta
-from database import get_db
+from database import get_db, get_primary_db, get_async_primary_db
 from models.room import Room
 from models.rental import Rental
 from models.users import User
@@ -10,6 +12,7 @@ from schemas.room import RoomCreate, RoomUpdate, Room as RoomSchema
 from pydantic import BaseModel
 from utils.auth import get_current_active_user
 from models.auth import AuthUser
+from utils.redis_config import cached
 
 router = APIRouter(prefix="/rooms", tags=["rooms"])
 tz = timezone(timedelta(hours=8))
@@ -22,40 +25,69 @@ class RoomWithTenant(BaseModel):
     class Config:
         from_attributes = True
 
-@router.get("/estate/{estate_id}/with-tenants", response_model=List[RoomWithTenant])
-def get_rooms_with_tenants_by_estate(
-    estate_id: int,
-    db: Session = Depends(get_db),
-    current_user: AuthUser = Depends(get_current_active_user)
-):
-    rooms = db.query(Room).filter(Room.estate_id == estate_id, Room.deleted_at == None).all()
-    
+def rooms_with_tenants_statement():
+    """房間、有效租約與租客名稱（依房間排序），由呼叫端加上物業條件"""
+    return (
+        select(Room.estate_id, Room.id, Room.room_number, Rental.id.label("rental_id"), User.name.label("tenant_name"))
+        .outerjoin(Rental, and_(Rental.room_id == Room.id, Rental.status == "active"))
+        .outerjoin(User, User.id == Rental.user_id)
+        .where(Room.deleted_at == None)
+        .order_by(Room.id, Rental.id)
+    )
+
+
+def rooms_with_tenants(rows) -> List[RoomWithTenant]:
     result = []
+    seen_rooms = set()
     
-    for room in rooms:
-        active_rental = db.query(Rental).filter(
-            Rental.room_id == room.id, 
-            Rental.status == "active"
-        ).first()
+    for row in rows:
+        # 同一房間若有多筆有效租約，只取第一筆
+        if row.id in seen_rooms:
+            continue
+        seen_rooms.add(row.id)
         
-        if active_rental:
-            tenant = db.query(User).filter(User.id == active_rental.user_id).first()
-            tenant_name = tenant.name if tenant else "未知租客"
+        if row.rental_id:
+            tenant_name = row.tenant_name if row.tenant_name else "未知租客"
         else:
             tenant_name = "空房"
             
         result.append(RoomWithTenant(
-            room_id=room.id,
-            room_name=room.room_number,
+            room_id=row.id,
+            room_name=row.room_number,
             tenant_name=tenant_name
         ))
     
     return result
 
+
+@router.get("/estate/{estate_id}/with-tenants", response_model=List[RoomWithTenant])
+@cached(
+    "rooms:estate:{estate_id}:with-tenants",
+    response_model=List[RoomWithTenant],
+    ttl=3600,
+    tags=["estate:{estate_id}"]
+)
+async def get_rooms_with_tenants_by_estate(
+    estate_id: int,
+    # 結果會寫入快取，讀 primary 以免把 replica 延遲的資料快取
+    db: AsyncSession = Depends(get_async_primary_db),
+    current_user: AuthUser = Depends(get_current_active_user)
+):
+    # 以一次查詢取得房間、有效租約與租客名稱
+    rows = (await db.execute(rooms_with_tenants_statement().where(Room.estate_id == estate_id))).all()
+    return rooms_with_tenants(rows)
+
 @router.get("/estate/{estate_id}", response_model=List[RoomSchema])
+@cached(
+    "rooms:estate:{estate_id}",
+    response_model=List[RoomSchema],
+    ttl=3600,
+    tags=["estate:{estate_id}"]
+)
 def get_rooms_by_estate(
     estate_id: int, 
-    db: Session = Depends(get_db),
+    # 結果會寫入快取，讀 primary 以免把 replica 延遲的資料快取
+    db: Session = Depends(get_primary_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
     rooms = db.query(Room).filter(Room.estate_id == estate_id, Room.deleted_at == None).all()
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import distinct
+from sqlalchemy import distinct, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict
-from database import get_db
+from database import get_db, get_async_db
 from datetime import datetime, timezone, timedelta
 from models.schedules import Schedule
 from models.auth import AuthUser
 from schemas.schedules import ScheduleCreate, ScheduleUpdate, Schedule as ScheduleSchema, ScheduleWithReplies
 from utils.auth import get_current_active_user
+from utils.pagination import SortKey, apply_keyset, set_next_cursor
 
 router = APIRouter(prefix="/schedules", tags=["schedules"])
 tz = timezone(timedelta(hours=8))
@@ -22,21 +24,27 @@ def get_schedules(
     return schedules
 
 @router.get("/estate-room", response_model=List[ScheduleSchema])
-def get_schedules_by_estate_room(
+async def get_schedules_by_estate_room(
+    response: Response,
     estate_id: Optional[int] = None, 
     room_id: Optional[int] = None, 
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
-    query = db.query(Schedule)
+    query = select(Schedule)
     if estate_id:
-        query = query.filter(Schedule.estate_id == estate_id)
+        query = query.where(Schedule.estate_id == estate_id)
     if room_id:
-        query = query.filter(Schedule.room_id == room_id)
+        query = query.where(Schedule.room_id == room_id)
     
-    schedules = query.order_by(Schedule.event_date.desc()).offset(skip).limit(limit).all()
+    # 提供 cursor 時使用 keyset 分頁，否則沿用 skip/limit
+    keys = [SortKey(Schedule.event_date, descending=True), SortKey(Schedule.id, descending=True)]
+    result = await db.execute(apply_keyset(query, keys, cursor, skip).limit(limit))
+    schedules = result.scalars().all()
+    set_next_cursor(response, schedules, keys, limit)
     return schedules
 
 @router.get("/counts", response_model=Dict[str, int])
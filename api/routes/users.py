@@ -1,22 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from database import get_db
 from models.users import User
 from schemas.users import UserCreate, UserUpdate, User as UserSchema
 from utils.auth import get_current_active_user
 from models.auth import AuthUser
+from utils.pagination import SortKey, apply_keyset, set_next_cursor
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/", response_model=List[UserSchema])
 def get_users(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: AuthUser = Depends(get_current_active_user)
 ):
-    users = db.query(User).offset(skip).limit(limit).all()
+    # 提供 cursor 時使用 keyset 分頁，否則沿用 skip/limit
+    keys = [SortKey(User.id)]
+    users = apply_keyset(db.query(User), keys, cursor, skip).limit(limit).all()
+    set_next_cursor(response, users, keys, limit)
     return users
 
 @router.post("/", response_model=UserSchema)
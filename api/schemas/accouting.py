@@ -31,6 +31,19 @@ class AccountingUpdate(BaseModel):
 
 class Accounting(AccountingBase):
     id: int
+    room_number: Optional[str] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class AccountingMonthlySummary(BaseModel):
+    estate_id: int
+    year: int
+    month: int
+    accounting_tag: str
+    payment_method: str
+    total: float
+    count: int
+
+    class Config:
+        orm_mode = True
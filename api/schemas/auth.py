@@ -11,6 +11,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    id: Optional[int] = None
 
 class AuthUserCreate(BaseModel):
     email: EmailStr
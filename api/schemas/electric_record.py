@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class ElectricRecordBase(BaseModel):
@@ -24,4 +24,35 @@ class ElectricRecord(ElectricRecordBase):
     updated_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ElectricRecordUpsert(BaseModel):
+    reading: float
+    recorder_id: Optional[int] = None
+
+
+class ElectricRecordBulkItem(BaseModel):
+    room_id: int
+    reading: float
+    year: int
+    month: int
+
+class ElectricRecordBulkCreate(BaseModel):
+    estate_id: int
+    recorder_id: Optional[int] = None
+    records: List[ElectricRecordBulkItem]
+
+class ElectricRecordBulkResult(BaseModel):
+    room_id: int
+    year: int
+    month: int
+    reading: float
+    status: str  # saved / rejected
+    record_id: Optional[int] = None
+    previous_reading: Optional[float] = None
+    detail: Optional[str] = None  # 被拒絕的原因
+
+class ElectricRecordBulkResponse(BaseModel):
+    saved: int
+    rejected: int
+    results: List[ElectricRecordBulkResult]
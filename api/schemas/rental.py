@@ -37,10 +37,28 @@ class Rental(RentalBase):
     id: int
     user_id: int
     created_at: datetime
+    # 由 rental_info 同步的欄位（唯讀）
+    payment_frequency: Optional[str] = None
+    early_checkin: Optional[str] = None
+    initial_electric: Optional[float] = None
 
     class Config:
         orm_mode = True
 
 # You might also want a response model that includes the parsed details
 class RentalResponse(Rental):
-    rental_info_details: Optional[RentalInfoDetails] = None
\ No newline at end of file
+    rental_info_details: Optional[RentalInfoDetails] = None
+
+# 即將到期的繳費（GET /rentals/payments/upcoming）
+class UpcomingPayment(BaseModel):
+    rental_id: int
+    room_id: int
+    room_number: str
+    estate_id: Optional[int] = None
+    tenant_name: Optional[str] = None
+    due_date: date
+    amount: Optional[float] = None
+    status: str
+
+    class Config:
+        orm_mode = True
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+驗證相依性（get_current_user）的吞吐量基準測試
+
+對執行中的 API 以固定併發量反覆呼叫需要登入的輕量端點（預設 /auth/me），
+輸出每秒請求數與延遲分位數。比較快取前後：
+
+    PRINCIPAL_CACHE_ENABLED=false uvicorn main:app --workers 1   # 之前
+    PRINCIPAL_CACHE_ENABLED=true  uvicorn main:app --workers 1   # 之後
+    python -m scripts.bench_auth --token <access token> -n 5000 -c 50
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+_local = threading.local()
+
+
+def _session(token: str) -> requests.Session:
+    # 每個執行緒各自一個 keep-alive 連線
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+        _local.session.headers["Authorization"] = f"Bearer {token}"
+    return _local.session
+
+
+def _call(url: str, token: str):
+    start = time.perf_counter()
+    response = _session(token).get(url, timeout=30)
+    return (time.perf_counter() - start) * 1000, response.status_code
+
+
+def run(url: str, token: str, total: int, concurrency: int):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # 暖機（建立連線並填入快取）
+        list(executor.map(lambda _: _call(url, token), range(concurrency)))
+
+        start = time.perf_counter()
+        results = list(executor.map(lambda _: _call(url, token), range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status_code in results if status_code != 200)
+    print(f"requests: {total}  concurrency: {concurrency}  errors: {errors}")
+    print(f"throughput: {total / elapsed:.1f} req/s")
+    print(
+        f"latency ms: p50={statistics.median(latencies):.2f} "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1]:.2f} max={latencies[-1]:.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="驗證相依性吞吐量基準測試")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API 位址")
+    parser.add_argument("--token", required=True, help="access token")
+    parser.add_argument("--path", default="/auth/me", help="需要登入的輕量端點")
+    parser.add_argument("-n", "--requests", type=int, default=5000)
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    run(args.url.rstrip("/") + args.path, args.token, args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
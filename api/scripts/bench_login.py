@@ -0,0 +1,90 @@
+"""
+登入尖峰基準測試
+
+以固定併發量反覆呼叫 /auth/token，同時在背景持續探測 /health，
+輸出登入吞吐量，以及登入尖峰期間 /health 的延遲（事件迴圈是否被 bcrypt 阻塞）：
+
+    PASSWORD_HASH_WORKERS=2 uvicorn main:app --workers 1
+    python -m scripts.bench_login --email user@example.com --password secret -n 200 -c 50
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+_local = threading.local()
+
+
+def _session() -> requests.Session:
+    # 每個執行緒各自一個 keep-alive 連線
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def _login(url: str, email: str, password: str):
+    start = time.perf_counter()
+    response = _session().post(url, data={"username": email, "password": password}, timeout=60)
+    return (time.perf_counter() - start) * 1000, response.status_code
+
+
+def _probe_health(url: str, stop: threading.Event, latencies: list, interval: float):
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        session.get(url, timeout=60)
+        latencies.append((time.perf_counter() - start) * 1000)
+        stop.wait(interval)
+
+
+def _summary(latencies) -> str:
+    latencies = sorted(latencies)
+    if not latencies:
+        return "no samples"
+    return (
+        f"p50={statistics.median(latencies):.2f} "
+        f"p99={latencies[max(int(len(latencies) * 0.99) - 1, 0)]:.2f} max={latencies[-1]:.2f}"
+    )
+
+
+def run(base_url: str, email: str, password: str, total: int, concurrency: int, interval: float):
+    login_url = base_url + "/auth/token"
+    health_url = base_url + "/health"
+
+    stop = threading.Event()
+    health_latencies = []
+    probe = threading.Thread(target=_probe_health, args=(health_url, stop, health_latencies, interval))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        probe.start()
+        start = time.perf_counter()
+        results = list(executor.map(lambda _: _login(login_url, email, password), range(total)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        probe.join()
+
+    errors = sum(1 for _, status_code in results if status_code != 200)
+    print(f"logins: {total}  concurrency: {concurrency}  errors: {errors}")
+    print(f"login throughput: {total / elapsed:.1f} req/s")
+    print(f"login latency ms: {_summary(latency for latency, _ in results)}")
+    print(f"/health latency ms during logins ({len(health_latencies)} samples): {_summary(health_latencies)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登入尖峰基準測試")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API 位址")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.05, help="/health 探測間隔（秒）")
+    args = parser.parse_args()
+
+    run(args.url.rstrip("/"), args.email, args.password, args.requests, args.concurrency, args.interval)
+
+
+if __name__ == "__main__":
+    main()
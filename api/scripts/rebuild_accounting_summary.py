@@ -0,0 +1,36 @@
+"""
+由 accounting 全量重建 accounting_monthly_summary
+
+於 api/ 目錄執行：
+    python -m scripts.rebuild_accounting_summary            # 全部物業
+    python -m scripts.rebuild_accounting_summary --estate 3 # 單一物業
+"""
+import argparse
+import logging
+
+from database import SessionLocal
+import models  # noqa: F401  載入所有模型
+from utils.accounting_summary import rebuild_accounting_summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建每月會計彙總表")
+    parser.add_argument("--estate", type=int, default=None, help="只重建指定物業 ID")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_accounting_summary(db, args.estate)
+        db.commit()
+        logging.info(f"Accounting summary rebuilt: {rows} rows")
+        print(f"已重建 {rows} 筆彙總資料")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
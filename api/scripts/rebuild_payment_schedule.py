@@ -0,0 +1,50 @@
+"""
+依 rentals 的繳費週期重新產生 rental_payment_schedule（已標記其他狀態的日期保留）
+migration 0003 建表時已回填，資料不一致時再執行
+
+於 api/ 目錄執行：
+    python -m scripts.rebuild_payment_schedule               # 全部租約
+    python -m scripts.rebuild_payment_schedule --rental 12   # 單一租約
+"""
+import argparse
+import logging
+
+from database import SessionLocal
+import models  # noqa: F401  載入所有模型
+from models.rental import Rental
+from utils.payment_schedule import sync_payment_schedule
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重新產生租約繳費日期")
+    parser.add_argument("--rental", type=int, default=None, help="只處理指定租約 ID")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批處理的租約數（每批 commit 一次）")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    total = 0
+    last_id = 0
+    try:
+        while True:
+            query = db.query(Rental).filter(Rental.id > last_id)
+            if args.rental is not None:
+                query = query.filter(Rental.id == args.rental)
+            rentals = query.order_by(Rental.id).limit(args.batch_size).all()
+            if not rentals:
+                break
+            last_id = rentals[-1].id
+            total += sync_payment_schedule(db, rentals)
+            db.commit()
+            db.expunge_all()
+        logging.info(f"Rental payment schedule rebuilt: {total} rows")
+        print(f"已產生 {total} 筆繳費日期")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
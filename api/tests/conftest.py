@@ -0,0 +1,74 @@
+import os
+import tempfile
+
+# 測試使用 sqlite 檔案（非同步 session 透過 aiosqlite 連到同一個檔案），必須在匯入 database / main 之前設定
+TEST_DATABASE_PATH = os.path.join(tempfile.mkdtemp(prefix="stds_test_"), "test.db")
+os.environ["ASYNC_DATABASE_URL"] = f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}"
+os.environ.setdefault("GCP_BUCKET_NAME", "test-bucket")
+# 不連線任何實際的 Redis（包括開發者本機的），指向沒有服務的埠：快取由斷路器略過，路由直接查詢資料庫
+os.environ["REDIS_HOST"] = "127.0.0.1"
+os.environ["REDIS_PORT"] = "1"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from utils import cloudstorage
+
+# 測試不連線 Google Cloud Storage
+cloudstorage.StorageService._get_storage_client = lambda self: None
+
+import database
+import main
+from models.auth import AuthUser
+from utils.auth import access_token_claims, create_access_token
+from utils.local_cache import local_cache
+from utils.query_stats import assert_max_queries
+
+test_engine = create_engine(f"sqlite:///{TEST_DATABASE_PATH}")
+database.SessionLocal.configure(bind=test_engine, replica_binds=[])
+
+
+@pytest.fixture(autouse=True)
+def _reset_database():
+    """每個測試使用空白的資料表與空白的 L1 快取（drop_all 不觸發 ORM 事件，不會清除快取）"""
+    database.Base.metadata.drop_all(test_engine)
+    database.Base.metadata.create_all(test_engine)
+    local_cache.clear()
+    yield
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def admin_headers(db):
+    user = AuthUser(email="admin@example.com", password_hash="x", name="Admin", role="admin", is_active=True)
+    db.add(user)
+    db.commit()
+    token = create_access_token(access_token_claims(user))
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def max_queries():
+    """斷言區塊內（含 TestClient 執行 app 的執行緒）執行的 SQL 不超過指定數量
+
+    用法::
+
+        def test_rooms(client, admin_headers, max_queries):
+            with max_queries(2):
+                client.get("/rooms/estate/1/with-tenants", headers=admin_headers)
+    """
+    return assert_max_queries
@@ -0,0 +1,133 @@
+import io
+import os
+from datetime import date, datetime
+
+import pytest
+
+import routes.imports
+from models.accouting import Accounting
+from models.accounting_summary import AccountingMonthlySummary
+from models.estate import Estate
+from models.rental import Rental
+from models.room import Room
+from models.users import User
+from utils.accounting_summary import add_rows_to_summary, rebuild_accounting_summary
+
+
+@pytest.fixture(autouse=True)
+def _cleanup_reports_immediately(monkeypatch):
+    """回應送出後立即刪除匯入報表，不等待背景任務的 5 分鐘延遲"""
+    async def cleanup_now(path, delay_seconds):
+        if os.path.exists(path):
+            os.unlink(path)
+    monkeypatch.setattr(routes.imports, "cleanup_temp_file", cleanup_now)
+
+
+@pytest.fixture
+def rental(db):
+    """建立物業、房間、租客與租約，回傳 (estate_id, rental_id)"""
+    estate = Estate(title="測試物業", owner_name="屋主")
+    db.add(estate)
+    db.flush()
+    room = Room(estate_id=estate.id, room_number="101")
+    tenant = User(name="租客")
+    db.add_all([room, tenant])
+    db.flush()
+    rental = Rental(
+        room_id=room.id, user_id=tenant.id, start_date=date(2024, 1, 1), end_date=date(2024, 12, 31), status="active"
+    )
+    db.add(rental)
+    db.commit()
+    return estate.id, rental.id
+
+
+def _summary(db):
+    """彙總表內容；筆數為 0 的列由增減抵銷後留下，查詢端點同樣略過"""
+    db.expire_all()
+    return sorted(
+        (row.estate_id, row.year, row.month, row.accounting_tag, row.payment_method, round(row.total, 2), row.count)
+        for row in db.query(AccountingMonthlySummary).filter(AccountingMonthlySummary.count != 0)
+    )
+
+
+def _assert_matches_rebuild(db):
+    """增量維護的彙總必須與全量重建的結果一致，回傳彙總內容"""
+    incremental = _summary(db)
+    rebuild_accounting_summary(db)
+    db.commit()
+    assert _summary(db) == incremental
+    return incremental
+
+
+def _payment(**values):
+    return {"title": "租金", "income": 1000, "date": "2024-03-05T00:00:00", "accounting_tag": "租金", **values}
+
+
+def test_create_update_delete_match_rebuild(client, db, rental):
+    estate_id, rental_id = rental
+
+    # 只有 rental_id 的記錄，物業由租約所屬房間取得
+    by_rental = client.post("/payments", json=_payment(rental_id=rental_id)).json()
+    by_estate = client.post(
+        "/payments", json=_payment(estate_id=estate_id, income=250.5, payment_method="現金")
+    ).json()
+    assert _assert_matches_rebuild(db) == [
+        (estate_id, 2024, 3, "租金", "", 1000, 1),
+        (estate_id, 2024, 3, "租金", "現金", 250.5, 1),
+    ]
+
+    # 移到另一個月份並改金額與類別
+    response = client.put(
+        f"/payments/{by_rental['id']}", json={"date": "2024-04-10T00:00:00", "income": 1200, "accounting_tag": "押金"}
+    )
+    assert response.status_code == 200
+    assert _assert_matches_rebuild(db) == [
+        (estate_id, 2024, 3, "租金", "現金", 250.5, 1),
+        (estate_id, 2024, 4, "押金", "", 1200, 1),
+    ]
+
+    assert client.delete(f"/payments/{by_estate['id']}").status_code == 200
+    assert _assert_matches_rebuild(db) == [(estate_id, 2024, 4, "押金", "", 1200, 1)]
+
+    assert client.delete(f"/payments/{by_rental['id']}").status_code == 200
+    assert _assert_matches_rebuild(db) == []
+
+
+def test_add_rows_matches_rebuild(db, rental):
+    estate_id, rental_id = rental
+    rows = [
+        {"title": "租金", "income": 1000, "date": datetime(2024, 5, 1), "rental_id": rental_id, "accounting_tag": "租金"},
+        {"title": "租金", "income": 500, "date": datetime(2024, 5, 20), "rental_id": rental_id, "accounting_tag": "租金"},
+        {"title": "電費", "income": 300, "date": datetime(2024, 6, 1), "estate_id": estate_id, "accounting_tag": "電費"},
+    ]
+    for row in rows:
+        db.add(Accounting(**row))
+    db.flush()
+    add_rows_to_summary(db, rows)
+    db.commit()
+
+    assert _assert_matches_rebuild(db) == [
+        (estate_id, 2024, 5, "租金", "", 1500, 2),
+        (estate_id, 2024, 6, "電費", "", 300, 1),
+    ]
+
+
+def test_import_payments_matches_rebuild(client, admin_headers, db, rental):
+    estate_id, _ = rental
+    client.post("/payments", json=_payment(estate_id=estate_id))
+
+    content = "房號,日期,金額,繳納方式\n101,2024-03-15,800,轉帳\n101,2024-04-01,1000,\n".encode()
+    response = client.post(
+        "/imports/payments",
+        data={"estate_id": str(estate_id)},
+        files={"file": ("payments.csv", io.BytesIO(content))},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Import-Imported"] == "2"
+
+    assert _assert_matches_rebuild(db) == [
+        (estate_id, 2024, 3, "租金", "", 1000, 1),
+        (estate_id, 2024, 3, "租金", "轉帳", 800, 1),
+        (estate_id, 2024, 4, "租金", "", 1000, 1),
+    ]
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import date, datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from database import async_engine, get_async_db
+from models.rental import Rental
+from models.room import Room
+from models.schedules import Schedule
+from models.users import User
+
+
+def _request(method: str) -> Request:
+    return Request({"type": "http", "method": method, "path": "/", "headers": []})
+
+
+async def _room_numbers(request):
+    dependency = get_async_db(request)
+    db = await dependency.__anext__()
+    try:
+        rows = (await db.execute(select(Room.room_number).order_by(Room.id))).scalars().all()
+        return db, rows
+    finally:
+        await dependency.aclose()
+        # 每次 asyncio.run 都是新的 event loop，不保留綁定在舊 loop 上的 aiosqlite 連線
+        await async_engine.dispose()
+
+
+def test_async_engine_uses_aiosqlite():
+    assert async_engine.dialect.driver == "aiosqlite"
+
+
+def test_get_async_db_reads_rows_written_by_sync_session(db):
+    db.add_all([Room(estate_id=1, room_number="101"), Room(estate_id=1, room_number="102")])
+    db.commit()
+
+    session, rows = asyncio.run(_room_numbers(_request("GET")))
+    assert isinstance(session, AsyncSession)
+    assert rows == ["101", "102"]
+
+
+def test_get_async_db_marks_only_get_requests_for_replica():
+    get_session, _ = asyncio.run(_room_numbers(_request("GET")))
+    post_session, _ = asyncio.run(_room_numbers(_request("POST")))
+    no_request_session, _ = asyncio.run(_room_numbers(None))
+    assert get_session.sync_session.use_replica is True
+    assert post_session.sync_session.use_replica is False
+    assert no_request_session.sync_session.use_replica is False
+
+
+def test_rentals_by_room_status(client, admin_headers, db):
+    room = Room(estate_id=1, room_number="101")
+    tenant = User(name="租客")
+    db.add_all([room, tenant])
+    db.flush()
+    db.add_all([
+        Rental(room_id=room.id, user_id=tenant.id, start_date=date(2024, month, 1), end_date=date(2025, month, 1), status=status)
+        for month, status in ((1, "active"), (2, "inactive"), (3, "inactive"))
+    ])
+    db.commit()
+
+    active = client.get(f"/rentals/room/{room.id}/status/1", headers=admin_headers)
+    inactive = client.get(f"/rentals/room/{room.id}/status/0", headers=admin_headers)
+    assert active.status_code == 200
+    assert [rental["status"] for rental in active.json()] == ["active"]
+    assert [rental["status"] for rental in inactive.json()] == ["inactive", "inactive"]
+
+
+def test_schedules_by_estate_room_cursor_pagination(client, admin_headers, db):
+    db.add_all([
+        Schedule(estate_id=1, room_id=1, event_date=datetime(2024, 1, day), description=f"day {day}")
+        for day in (1, 2, 3)
+    ])
+    db.add(Schedule(estate_id=2, room_id=5, event_date=datetime(2024, 1, 4), description="other estate"))
+    db.commit()
+
+    first = client.get("/schedules/estate-room", params={"estate_id": 1, "limit": 2}, headers=admin_headers)
+    assert first.status_code == 200
+    assert [schedule["description"] for schedule in first.json()] == ["day 3", "day 2"]
+
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(
+        "/schedules/estate-room", params={"estate_id": 1, "limit": 2, "cursor": cursor}, headers=admin_headers
+    )
+    assert [schedule["description"] for schedule in second.json()] == ["day 1"]
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_unauthenticated_request_is_rejected(client):
+    response = client.get("/schedules/estate-room", headers={"Authorization": "Bearer invalid"})
+    assert response.status_code == 401
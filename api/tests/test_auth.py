@@ -0,0 +1,29 @@
+import threading
+
+import utils.auth
+from models.auth import AuthUser
+
+
+def _register(client, headers, email):
+    return client.post(
+        "/auth/register", json={"email": email, "password": "secret", "name": "Staff"}, headers=headers
+    )
+
+
+def test_register_then_login(client, admin_headers):
+    assert _register(client, admin_headers, "staff@example.com").status_code == 200
+
+    response = client.post("/auth/token", data={"username": "staff@example.com", "password": "secret"})
+    assert response.status_code == 200
+    assert "access_token" in response.json()
+
+
+def test_password_hash_queue_full_returns_503(client, admin_headers, db, monkeypatch):
+    # 唯一的名額已被佔用，模擬排隊中的雜湊已達上限
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(utils.auth, "_hash_slots", slots)
+
+    response = _register(client, admin_headers, "staff@example.com")
+    assert response.status_code == 503
+    assert db.query(AuthUser).filter(AuthUser.email == "staff@example.com").count() == 0
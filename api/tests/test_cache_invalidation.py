@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+from models.rental import Rental
+from models.room import Room
+from models.users import User
+from utils.local_cache import MISSING, local_cache
+from utils.redis_config import get_cache, invalidate_tags, set_cache
+
+
+@pytest.fixture
+def rental(db):
+    room = Room(estate_id=1, room_number="101")
+    tenant = User(name="租客")
+    db.add_all([room, tenant])
+    db.flush()
+    rental = Rental(
+        room_id=room.id, user_id=tenant.id, start_date=date(2024, 1, 1), end_date=date(2025, 1, 1), status="active"
+    )
+    db.add(rental)
+    db.commit()
+    return rental
+
+
+def test_invalidate_tags_without_redis_clears_local_cache():
+    # 測試環境沒有 Redis，set_cache 只寫入 L1
+    set_cache("rentals:room:1:status:1", [{"id": 1}], tags=["room:1"])
+    assert get_cache("rentals:room:1:status:1") == [{"id": 1}]
+
+    assert invalidate_tags("room:1") == 0
+    assert get_cache("rentals:room:1:status:1") is None
+
+
+def test_commit_invalidates_cached_rentals_without_redis(client, admin_headers, db, rental):
+    url = f"/rentals/room/{rental.room_id}/status/1"
+    assert [item["id"] for item in client.get(url, headers=admin_headers).json()] == [rental.id]
+    assert local_cache.get(f"rentals:room:{rental.room_id}:status:1") is not MISSING
+
+    # 退租：ORM 提交後依 room 標籤清除快取
+    rental.status = "inactive"
+    db.commit()
+
+    assert client.get(url, headers=admin_headers).json() == []
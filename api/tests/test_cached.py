@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from typing import List
+
+import fakeredis
+import pytest
+from pydantic import BaseModel
+
+import utils.redis_config as redis_config
+from utils.circuit_breaker import CircuitBreaker
+from utils.local_cache import local_cache
+from utils.redis_config import cached, set_cache
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """以 fakeredis 取代 Redis（含非同步客戶端與斷路器），鎖與標籤集合照常運作"""
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    async_clients = {}
+
+    def get_async_redis():
+        loop = asyncio.get_running_loop()
+        if loop not in async_clients:
+            async_clients[loop] = fakeredis.FakeAsyncRedis(server=server)
+        return async_clients[loop]
+
+    monkeypatch.setattr(redis_config, "redis_client", client)
+    monkeypatch.setattr(redis_config, "redis_binary_client", fakeredis.FakeRedis(server=server))
+    monkeypatch.setattr(redis_config, "get_async_redis", get_async_redis)
+    monkeypatch.setattr(redis_config, "redis_breaker", CircuitBreaker("redis", 5, 30))
+    local_cache.clear()
+    return client
+
+
+@pytest.fixture
+def source():
+    """路由查詢的資料與呼叫次數"""
+    return {"items": [{"id": 1, "name": "a"}], "calls": 0, "delay": 0}
+
+
+@pytest.fixture
+def get_items(source):
+    @cached("items:{group}", response_model=List[Item], ttl=60, tags=["group:{group}"], stale_ttl=60)
+    def get_items(group: int):
+        source["calls"] += 1
+        time.sleep(source["delay"])
+        return list(source["items"])
+    return get_items
+
+
+def test_miss_then_hit(fake_redis, source, get_items):
+    first = get_items(group=1)
+    second = get_items(group=1)
+    assert source["calls"] == 1
+    assert first == second == [Item(id=1, name="a")]
+    assert fake_redis.exists("items:1")
+    assert fake_redis.smembers("tag:group:1") == {"items:1"}
+
+
+def test_empty_result_is_cached(fake_redis, source, get_items):
+    source["items"] = []
+    assert get_items(group=1) == []
+    assert get_items(group=1) == []
+    assert source["calls"] == 1
+
+
+def test_local_hit_reuses_validated_value_without_mutating_entry(fake_redis, source, get_items):
+    first = get_items(group=1)
+    assert get_items(group=1) is first
+    # 與 L1 共用的 entry 不可被修改
+    assert set(local_cache.get("items:1")) == {"fresh_until", "data"}
+
+
+def test_redis_hit_after_local_cache_cleared(fake_redis, source, get_items):
+    get_items(group=1)
+    local_cache.clear()
+    assert get_items(group=1) == [Item(id=1, name="a")]
+    assert source["calls"] == 1
+
+
+def test_stale_entry_served_while_another_request_refreshes(fake_redis, source, get_items):
+    set_cache("items:1", {"fresh_until": time.time() - 1, "data": [{"id": 1, "name": "old"}]}, 60)
+    source["items"] = [{"id": 1, "name": "new"}]
+
+    lock = fake_redis.lock("lock:items:1", timeout=10)
+    assert lock.acquire(blocking=False)
+    assert get_items(group=1) == [Item(id=1, name="old")]
+    assert source["calls"] == 0
+
+    lock.release()
+    assert get_items(group=1) == [Item(id=1, name="new")]
+    assert source["calls"] == 1
+
+
+def test_concurrent_misses_compute_once(fake_redis, source, get_items):
+    source["delay"] = 0.3
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_items(group=1))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+    assert source["calls"] == 1
+    assert results == [[Item(id=1, name="a")]] * 3
+
+
+def test_sync_waiters_over_limit_compute_directly(fake_redis, source, get_items, monkeypatch):
+    waiters = threading.BoundedSemaphore(1)
+    waiters.acquire()
+    monkeypatch.setattr(redis_config, "_sync_waiters", waiters)
+    lock = fake_redis.lock("lock:items:1", timeout=10)
+    assert lock.acquire(blocking=False)
+
+    start = time.monotonic()
+    assert get_items(group=1) == [Item(id=1, name="a")]
+    assert time.monotonic() - start < 1
+    assert source["calls"] == 1
+
+
+def test_async_concurrent_misses_compute_once(fake_redis, source):
+    @cached("async-items:{group}", response_model=List[Item], ttl=60)
+    async def get_async_items(group: int):
+        source["calls"] += 1
+        await asyncio.sleep(0.2)
+        return source["items"]
+
+    async def run():
+        return await asyncio.gather(*(get_async_items(group=1) for _ in range(3)))
+
+    assert asyncio.run(run()) == [[Item(id=1, name="a")]] * 3
+    assert source["calls"] == 1
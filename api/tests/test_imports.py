@@ -0,0 +1,71 @@
+import csv
+import io
+import os
+
+import pytest
+
+import routes.imports
+from models.electric_record import ElectricRecord
+from models.estate import Estate
+from models.room import Room
+from routes.generate import TEMP_DIR
+
+
+@pytest.fixture(autouse=True)
+def _cleanup_reports_immediately(monkeypatch):
+    """回應送出後立即刪除報表，不等待背景任務的 5 分鐘延遲"""
+    async def cleanup_now(path, delay_seconds):
+        if os.path.exists(path):
+            os.unlink(path)
+    monkeypatch.setattr(routes.imports, "cleanup_temp_file", cleanup_now)
+
+
+@pytest.fixture
+def estate_id(db):
+    estate = Estate(title="測試物業", owner_name="屋主")
+    db.add(estate)
+    db.flush()
+    db.add(Room(estate_id=estate.id, room_number="101"))
+    db.commit()
+    return estate.id
+
+
+def _leftover_files():
+    return {name for name in os.listdir(TEMP_DIR) if name.startswith("import_")}
+
+
+def _import(client, headers, estate_id, filename, content, **params):
+    return client.post(
+        "/imports/electric-records",
+        params=params,
+        data={"estate_id": str(estate_id)},
+        files={"file": (filename, io.BytesIO(content))},
+        headers=headers,
+    )
+
+
+@pytest.mark.parametrize("filename, content", [
+    ("broken.xlsx", b"not a zip file"),
+    ("header.csv", "foo,bar\n1,2\n".encode()),
+    ("encoding.csv", b"\xff\xfe\x00bad"),
+])
+def test_unreadable_file_returns_400(client, admin_headers, db, estate_id, filename, content):
+    before = _leftover_files()
+    response = _import(client, admin_headers, estate_id, filename, content)
+    assert response.status_code == 400
+    assert _leftover_files() == before
+    assert db.query(ElectricRecord).count() == 0
+
+
+def test_read_error_after_committed_chunks_returns_report(client, admin_headers, db, estate_id):
+    rows = "房號,年,月,讀數\n" + "".join(f"101,2024,{month},{month * 10}\n" for month in range(1, 5))
+    content = (rows + '"101,2024,5,50\n101,2024,6,60\n').encode()
+
+    response = _import(client, admin_headers, estate_id, "readings.csv", content, chunk_size=2)
+
+    assert response.status_code == 200
+    assert response.headers["X-Import-Imported"] == "4"
+    assert response.headers["X-Import-Total"] == "4"
+    assert db.query(ElectricRecord).count() == 4
+    report = list(csv.reader(io.StringIO(response.content.decode("utf-8-sig"))))
+    assert report[-1][-1].startswith("第 5 列之後無法讀取，匯入已中止")
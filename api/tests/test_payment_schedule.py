@@ -0,0 +1,161 @@
+import json
+from datetime import date
+
+import pytest
+
+from models.estate import Estate
+from models.rental import Rental
+from models.rental_payment_schedule import RentalPaymentSchedule
+from models.room import Room
+from models.users import User
+from utils.payment_schedule import schedule_dates, sync_payment_schedule, truncate_payment_schedule
+
+QUARTERLY = [date(2024, 1, 15), date(2024, 4, 15), date(2024, 7, 15), date(2024, 10, 15)]
+
+
+def _info(money):
+    return json.dumps({"money": money}, ensure_ascii=False)
+
+
+@pytest.fixture
+def make_rental(db):
+    """建立房間、租客與租約（並產生繳費日期），回傳租約"""
+    estate = Estate(title="測試物業", owner_name="屋主")
+    db.add(estate)
+    db.flush()
+
+    def make(room_number="101", money="季繳", start=date(2024, 1, 15), end=date(2024, 12, 31), status="active"):
+        room = Room(estate_id=estate.id, room_number=room_number)
+        tenant = User(name=f"租客{room_number}")
+        db.add_all([room, tenant])
+        db.flush()
+        rental = Rental(
+            room_id=room.id, user_id=tenant.id, start_date=start, end_date=end, rental_info=_info(money), status=status
+        )
+        db.add(rental)
+        db.flush()
+        sync_payment_schedule(db, [rental])
+        db.commit()
+        return rental
+    return make
+
+
+def _schedule(db, rental_id):
+    return [
+        (row.due_date, row.status, row.amount)
+        for row in db.query(RentalPaymentSchedule)
+        .filter(RentalPaymentSchedule.rental_id == rental_id)
+        .order_by(RentalPaymentSchedule.due_date)
+    ]
+
+
+def _due_dates(db, rental_id):
+    return [due_date for due_date, _, _ in _schedule(db, rental_id)]
+
+
+def test_schedule_dates():
+    rental = Rental(start_date=date(2024, 1, 15), end_date=date(2024, 12, 31), rental_info=_info("季繳"))
+    assert schedule_dates(rental) == QUARTERLY
+
+    unknown_frequency = Rental(start_date=date(2024, 1, 15), end_date=date(2024, 12, 31), rental_info=_info("週繳"))
+    no_end_date = Rental(start_date=date(2024, 1, 15), end_date=None, rental_info=_info("月繳"))
+    assert schedule_dates(unknown_frequency) == []
+    assert schedule_dates(no_end_date) == []
+
+
+def test_sync_keeps_non_pending_dates(db, make_rental):
+    rental = make_rental()
+    assert _due_dates(db, rental.id) == QUARTERLY
+
+    paid = db.query(RentalPaymentSchedule).filter_by(rental_id=rental.id, due_date=date(2024, 4, 15)).one()
+    paid.status = "paid"
+    db.flush()
+    rental.rental_info = _info("半年")
+    assert sync_payment_schedule(db, [rental]) == 2
+    db.commit()
+
+    assert _schedule(db, rental.id) == [
+        (date(2024, 1, 15), "pending", None),
+        (date(2024, 4, 15), "paid", None),
+        (date(2024, 7, 15), "pending", None),
+    ]
+
+
+def test_truncate_removes_only_pending_dates_after_checkout(db, make_rental):
+    rental = make_rental()
+    db.query(RentalPaymentSchedule).filter_by(rental_id=rental.id, due_date=date(2024, 10, 15)).one().status = "paid"
+    db.flush()
+
+    truncate_payment_schedule(db, rental.id, date(2024, 5, 1))
+    db.commit()
+
+    assert _due_dates(db, rental.id) == [date(2024, 1, 15), date(2024, 4, 15), date(2024, 10, 15)]
+
+
+def _put(client, headers, rental, **changes):
+    body = {
+        "room_id": rental.room_id,
+        "start_date": rental.start_date.isoformat(),
+        "end_date": rental.end_date.isoformat(),
+        "rental_info": rental.rental_info,
+        "status": rental.status,
+        **changes,
+    }
+    return client.put(f"/rentals/{rental.id}", json=body, headers=headers)
+
+
+def test_update_without_schedule_changes_keeps_pending_rows(client, admin_headers, db, make_rental):
+    rental = make_rental()
+    # 手動填入的金額在重新產生時會遺失，用來確認沒有刪除重建
+    db.query(RentalPaymentSchedule).filter_by(rental_id=rental.id).update({"amount": 1000})
+    db.commit()
+
+    assert _put(client, admin_headers, rental, deposit=5000).status_code == 200
+    db.expire_all()
+    assert [amount for _, _, amount in _schedule(db, rental.id)] == [1000] * 4
+
+
+def test_update_end_date_resyncs_schedule(client, admin_headers, db, make_rental):
+    rental = make_rental()
+    assert _put(client, admin_headers, rental, end_date="2025-03-31").status_code == 200
+    db.expire_all()
+    assert _due_dates(db, rental.id) == QUARTERLY + [date(2025, 1, 15)]
+
+
+def test_update_inactive_rental_does_not_resync(client, admin_headers, db, make_rental):
+    rental = make_rental(status="inactive")
+    truncate_payment_schedule(db, rental.id, date(2024, 5, 1))
+    db.commit()
+
+    assert _put(client, admin_headers, rental, end_date="2025-03-31").status_code == 200
+    db.expire_all()
+    assert _due_dates(db, rental.id) == QUARTERLY[:2]
+
+
+def test_upcoming_payments(client, admin_headers, db, make_rental):
+    active = make_rental("101")
+    make_rental("102", money="月繳", start=date(2024, 4, 20))
+    make_rental("103", status="inactive")
+
+    response = client.get(
+        "/rentals/payments/upcoming", params={"from": "2024-04-01", "to": "2024-04-30"}, headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert [(item["room_number"], item["due_date"], item["tenant_name"]) for item in response.json()] == [
+        ("101", "2024-04-15", "租客101"),
+        ("102", "2024-04-20", "租客102"),
+    ]
+
+    other_estate = client.get(
+        "/rentals/payments/upcoming",
+        params={"from": "2024-04-01", "to": "2024-04-30", "estate_id": active.room.estate_id + 1},
+        headers=admin_headers,
+    )
+    assert other_estate.json() == []
+
+
+def test_upcoming_payments_rejects_reversed_range(client, admin_headers):
+    response = client.get(
+        "/rentals/payments/upcoming", params={"from": "2024-04-30", "to": "2024-04-01"}, headers=admin_headers
+    )
+    assert response.status_code == 400
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert
+
+from models.accouting import Accounting
+from models.estate import Estate
+from models.rental import Rental
+from models.room import Room
+from models.users import User
+from utils.query_stats import normalize_statement
+
+ROOM_COUNT = 5
+
+
+@pytest.fixture
+def estate_id(db):
+    """有 ROOM_COUNT 間出租中房間（各有一筆會計記錄）與一間空房的物業，回傳物業 ID"""
+    estate = Estate(title="測試物業", owner_name="屋主")
+    db.add(estate)
+    db.flush()
+    for index in range(ROOM_COUNT):
+        room = Room(estate_id=estate.id, room_number=f"{101 + index}")
+        tenant = User(name=f"租客{index}")
+        db.add_all([room, tenant])
+        db.flush()
+        rental = Rental(room_id=room.id, user_id=tenant.id, status="active")
+        db.add(rental)
+        db.flush()
+        db.add(Accounting(title="租金", income=1000, date=datetime(2024, 1, 1), estate_id=estate.id, rental_id=rental.id))
+    db.add(Room(estate_id=estate.id, room_number="201"))
+    db.commit()
+    return estate.id
+
+
+def test_normalize_statement_collapses_parameters():
+    assert normalize_statement("SELECT * FROM rooms WHERE id = 3 AND name = 'a'") == (
+        "SELECT * FROM rooms WHERE id = ? AND name = ?"
+    )
+    assert normalize_statement("SELECT * FROM rooms WHERE id IN (?, ?, ?)") == "SELECT * FROM rooms WHERE id IN (...)"
+
+
+def test_rooms_with_tenants_query_count(client, admin_headers, estate_id, max_queries):
+    # 驗證使用者 1 條 + 房間與租客 1 條，不隨房間數增加
+    with max_queries(2):
+        response = client.get(f"/rooms/estate/{estate_id}/with-tenants", headers=admin_headers)
+    assert response.status_code == 200
+    tenants = [room["tenant_name"] for room in response.json()]
+    assert tenants == [f"租客{index}" for index in range(ROOM_COUNT)] + ["空房"]
+
+
+def test_estate_accounting_query_count(client, estate_id, max_queries):
+    with max_queries(1):
+        response = client.get(f"/estate/{estate_id}")
+    assert response.status_code == 200
+    assert sorted(record["room_number"] for record in response.json()) == [f"{101 + i}" for i in range(ROOM_COUNT)]
+
+
+def test_query_count_headers(client, estate_id):
+    response = client.get(f"/estate/{estate_id}")
+    assert response.headers["X-DB-Queries"] == "1"
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+
+
+def test_max_queries_reports_statements(client, estate_id, max_queries):
+    with pytest.raises(AssertionError, match="Expected at most 0 queries, got 1"):
+        with max_queries(0):
+            client.get(f"/estate/{estate_id}")
+
+
+
+@pytest.mark.parametrize("room_count", [1, 3])
+def test_cached_rooms_do_not_leak_between_tests(client, admin_headers, db, room_count):
+    # 以 Core insert 建立資料（與 drop_all 一樣不觸發 ORM 快取失效），每個測試的物業 ID 相同，
+    # 快取若在測試間殘留，第二個測試會讀到前一個的結果
+    db.execute(insert(Estate.__table__), [{"id": 1, "title": "測試物業", "owner_name": "屋主"}])
+    db.execute(insert(Room.__table__), [{"estate_id": 1, "room_number": f"{101 + i}"} for i in range(room_count)])
+    db.commit()
+
+    response = client.get("/rooms/estate/1/with-tenants", headers=admin_headers)
+    assert len(response.json()) == room_count
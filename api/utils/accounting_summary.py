@@ -0,0 +1,134 @@
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import delete, extract, func, insert, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+from models.accouting import Accounting
+from models.accounting_summary import AccountingMonthlySummary
+from models.rental import Rental
+from models.room import Room
+
+
+def _upsert_delta_statement(dialect_name: str, values: dict):
+    """將金額與筆數累加到彙總列（不存在則新增）"""
+    table = AccountingMonthlySummary.__table__
+    if dialect_name == "sqlite":
+        stmt = sqlite.insert(table).values(**values)
+        return stmt.on_conflict_do_update(
+            index_elements=["estate_id", "year", "month", "accounting_tag", "payment_method"],
+            set_={
+                "total": table.c.total + stmt.excluded.total,
+                "count": table.c.count + stmt.excluded.count,
+                "updated_at": func.now(),
+            }
+        )
+
+    stmt = mysql.insert(table).values(**values)
+    return stmt.on_duplicate_key_update(
+        total=table.c.total + stmt.inserted.total,
+        count=table.c.count + stmt.inserted.count,
+        updated_at=func.now()
+    )
+
+
+def _resolve_estate_id(db: Session, estate_id: Optional[int], rental_id: Optional[int]) -> Optional[int]:
+    """會計記錄未填物業時，由租約所屬房間取得"""
+    if estate_id or not rental_id:
+        return estate_id
+    return db.execute(
+        select(Room.estate_id).join(Rental, Rental.room_id == Room.id).where(Rental.id == rental_id)
+    ).scalar()
+
+
+def apply_summary_delta(
+    db: Session,
+    estate_id: Optional[int],
+    rental_id: Optional[int],
+    date: Optional[datetime],
+    accounting_tag: Optional[str],
+    payment_method: Optional[str],
+    amount: float,
+    count: int
+):
+    """在同一交易中增減某筆會計記錄對每月彙總的影響（不 commit）"""
+    estate_id = _resolve_estate_id(db, estate_id, rental_id)
+    if not estate_id or date is None:
+        return
+    if isinstance(date, str):
+        date = datetime.fromisoformat(date)
+
+    values = {
+        "estate_id": estate_id,
+        "year": date.year,
+        "month": date.month,
+        "accounting_tag": accounting_tag or "",
+        "payment_method": payment_method or "",
+        "total": amount or 0,
+        "count": count,
+    }
+    db.execute(_upsert_delta_statement(db.get_bind().dialect.name, values))
+
+
+def add_to_summary(db: Session, record: Accounting, sign: int = 1):
+    """新增（sign=1）或移除（sign=-1）一筆會計記錄的彙總"""
+    apply_summary_delta(
+        db, record.estate_id, record.rental_id, record.date,
+        record.accounting_tag, record.payment_method,
+        sign * (record.income or 0), sign
+    )
+
+
+def add_rows_to_summary(db: Session, rows: Iterable[dict]):
+    """批次新增的會計資料（dict）先在記憶體中彙總，每個彙總鍵只寫一次"""
+    totals = {}
+    for row in rows:
+        key = (
+            row.get("estate_id"), row.get("rental_id"), row["date"].year, row["date"].month,
+            row.get("accounting_tag"), row.get("payment_method")
+        )
+        total, count = totals.get(key, (0, 0))
+        totals[key] = (total + (row.get("income") or 0), count + 1)
+
+    for (estate_id, rental_id, year, month, tag, method), (total, count) in totals.items():
+        apply_summary_delta(db, estate_id, rental_id, datetime(year, month, 1), tag, method, total, count)
+
+
+def rebuild_accounting_summary(db: Session, estate_id: Optional[int] = None) -> int:
+    """由 accounting 全量重建彙總表（可只重建單一物業），回傳彙總列數（不 commit）"""
+    summary = AccountingMonthlySummary.__table__
+    resolved_estate = func.coalesce(Accounting.estate_id, Room.estate_id)
+    year = extract("year", Accounting.date)
+    month = extract("month", Accounting.date)
+    tag = func.coalesce(Accounting.accounting_tag, "")
+    method = func.coalesce(Accounting.payment_method, "")
+
+    source = select(
+        resolved_estate,
+        year,
+        month,
+        tag,
+        method,
+        func.coalesce(func.sum(Accounting.income), 0),
+        func.count(Accounting.id)
+    ).outerjoin(
+        Rental, Rental.id == Accounting.rental_id
+    ).outerjoin(
+        Room, Room.id == Rental.room_id
+    ).where(
+        resolved_estate.isnot(None),
+        Accounting.date.isnot(None)
+    ).group_by(resolved_estate, year, month, tag, method)
+
+    clear = delete(summary)
+    if estate_id is not None:
+        source = source.where(resolved_estate == estate_id)
+        clear = clear.where(summary.c.estate_id == estate_id)
+
+    db.execute(clear)
+    result = db.execute(
+        insert(summary).from_select(
+            ["estate_id", "year", "month", "accounting_tag", "payment_method", "total", "count"],
+            source
+        )
+    )
+    return result.rowcount
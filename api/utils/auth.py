@@ -4,26 +4,63 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from typing import Optional
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
+from database import get_async_db
 from models.auth import AuthUser
 from schemas.auth import TokenData
+from utils.principal_cache import aget_principal, aset_principal
+from utils.token_version import aget_token_version, acache_token_version
 
 # 配置常量
 SECRET_KEY = "your-secret-key"  
 ALGORITHM = "HS256"
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# 無狀態模式：信任 access token 中的身分欄位，只以 token 版本（Redis 快取的 users.token_version）確認未被撤銷
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
+# bcrypt 成本；調整後使用者下次登入時會自動以新成本重新雜湊（min = max = default）
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# 同時進行 bcrypt 運算的上限；使用獨立的執行緒池，登入尖峰時不會佔滿 FastAPI 的 threadpool
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+# 同步路由（註冊、修改密碼）同時等待 bcrypt 的上限；超過時回傳 503，不讓排隊的請求佔滿 FastAPI 的 threadpool
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 8))
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_QUEUE_SIZE)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    """供同步路由使用；等待中的雜湊已達 PASSWORD_HASH_QUEUE_SIZE 時回傳 503"""
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many password operations in progress, please retry"
+        )
+    try:
+        return _hash_executor.submit(pwd_context.hash, password).result()
+    finally:
+        _hash_slots.release()
+
+async def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """在 bcrypt 執行緒池中驗證密碼；成本設定變更時一併回傳新的雜湊"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _hash_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -35,7 +72,47 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def access_token_claims(user: AuthUser) -> dict:
+    """登入與 refresh 共用的 access token 內容"""
+    return {
+        "sub": user.email,
+        "role": user.role,
+        "name": user.name,
+        "id": user.id,
+        "ver": user.token_version or 0
+    }
+
+def create_user_tokens(user: AuthUser) -> dict:
+    access_token = create_access_token(
+        data=access_token_claims(user),
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_refresh_token(
+        data={
+            "sub": user.email,
+            "user_id": user.id
+        }
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+def _principal_from_claims(payload: dict) -> AuthUser:
+    """以 token 內容建立使用者（只有 id / email / role / name / token_version）"""
+    user = AuthUser(
+        id=payload["id"],
+        email=payload["sub"],
+        role=payload.get("role"),
+        name=payload.get("name"),
+        is_active=True,
+        token_version=payload.get("ver")
+    )
+    user.partial = True
+    return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -50,16 +127,66 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         token_data = TokenData(email=email, id=id)
     except JWTError:
         raise credentials_exception
-    user = db.query(AuthUser).filter(AuthUser.email == token_data.email).first()
+
+    # 無狀態模式：token 版本與快取一致即信任；舊格式 token、版本未快取或 Redis 無法使用時走一般流程（查資料庫）
+    if AUTH_STATELESS and token_data.id is not None and "ver" in payload:
+        current_version = await aget_token_version(token_data.id)
+        if current_version is not None:
+            if current_version != payload["ver"]:
+                raise credentials_exception
+            return _principal_from_claims(payload)
+
+    # 先查快取（以 id 為鍵）；email 已變更的舊 token 不使用快取
+    user = await aget_principal(token_data.id)
+    if user is not None and user.email == token_data.email:
+        if "ver" in payload and payload["ver"] != (user.token_version or 0):
+            raise credentials_exception
+        return user
+
+    if token_data.id is not None:
+        query = select(AuthUser).where(AuthUser.id == token_data.id, AuthUser.email == token_data.email)
+    else:
+        # refresh 換發的舊 token 沒有 id
+        query = select(AuthUser).where(AuthUser.email == token_data.email)
+    result = await db.execute(query)
+    user = result.scalars().first()
+    # 釋放連線，避免整個請求期間佔用連接池（已載入的欄位仍可使用）
+    await db.close()
     if user is None:
         raise credentials_exception
+    if "ver" in payload and payload["ver"] != (user.token_version or 0):
+        raise credentials_exception
+    await aset_principal(user)
+    if AUTH_STATELESS:
+        await acache_token_version(user.id, user.token_version or 0)
     return user
 
-def get_current_active_user(current_user: AuthUser = Depends(get_current_user)):
+async def get_current_active_user(current_user: AuthUser = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+async def get_current_full_user(
+    current_user: AuthUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """需要完整使用者資料的端點使用（快取或 token 建立的 current_user 只有驗證用的欄位）"""
+    if not getattr(current_user, "partial", False):
+        return current_user
+
+    result = await db.execute(select(AuthUser).where(AuthUser.id == current_user.id))
+    user = result.scalars().first()
+    await db.close()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
+
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
@@ -0,0 +1,61 @@
+import os
+import json
+import zlib
+from typing import Any, Tuple
+
+import orjson
+
+# 快取值的編碼方式（orjson / json）；超過門檻（位元組）的資料以 zlib 壓縮
+CACHE_CODEC = os.getenv("CACHE_CODEC", "orjson")
+CACHE_COMPRESS_THRESHOLD = int(os.getenv("CACHE_COMPRESS_THRESHOLD", 1024))
+CACHE_COMPRESS_LEVEL = int(os.getenv("CACHE_COMPRESS_LEVEL", 6))
+
+# 第一個位元組標示格式；沒有標頭的舊資料是 json.dumps 的文字
+_PLAIN = b"\x01"
+_ZLIB = b"\x02"
+
+
+class JsonCodec:
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+CODECS = {
+    "json": JsonCodec(),
+    "orjson": OrjsonCodec(),
+}
+codec = CODECS[CACHE_CODEC]
+
+
+def encode_sized(value: Any) -> Tuple[bytes, int]:
+    """序列化並加上格式標頭，大於門檻時壓縮（只在壓縮後較小時採用），一併回傳壓縮前的大小"""
+    data = codec.dumps(value)
+    if len(data) >= CACHE_COMPRESS_THRESHOLD:
+        compressed = zlib.compress(data, CACHE_COMPRESS_LEVEL)
+        if len(compressed) < len(data):
+            return _ZLIB + compressed, len(data)
+    return _PLAIN + data, len(data)
+
+
+def encode(value: Any) -> bytes:
+    return encode_sized(value)[0]
+
+
+def decode(data: bytes) -> Any:
+    header, body = data[:1], data[1:]
+    if header == _ZLIB:
+        return codec.loads(zlib.decompress(body))
+    if header == _PLAIN:
+        return codec.loads(body)
+    return json.loads(data)
@@ -0,0 +1,135 @@
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from models.rental import Rental
+from models.room import Room
+from models.users import User
+from utils.redis_config import invalidate_tags
+
+# 以 ORM 事件維持快取一致：flush 時依 model 收集受影響的快取標籤，
+# 交易提交後一次清除（rollback 則捨棄），任何 router 寫入這些 model 都會自動失效
+TagBuilder = Callable[[Session, List[Dict[str, Any]]], Iterable[str]]
+_registry: Dict[type, List[TagBuilder]] = defaultdict(list)
+
+PENDING_TAGS_KEY = "cache_invalidation_tags"
+
+
+def register(model: type, *templates: str):
+    """以欄位名稱組成的標籤模板，例如 register(Room, "estate:{estate_id}")；欄位為 None 時略過"""
+    def build(session: Session, rows: List[Dict[str, Any]]) -> Iterable[str]:
+        for row in rows:
+            for template in templates:
+                try:
+                    yield template.format_map(_NoneGuard(row))
+                except _MissingValue:
+                    continue
+
+    _registry[model].append(build)
+
+
+def tag_builder(model: type):
+    """註冊需要查詢才能得到標籤的函式（例如經由房間找到物業），參數為 session 與變更前後的欄位值"""
+    def decorator(func: TagBuilder) -> TagBuilder:
+        _registry[model].append(func)
+        return func
+    return decorator
+
+
+class _MissingValue(Exception):
+    pass
+
+
+class _NoneGuard(dict):
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if value is None:
+            raise _MissingValue(key)
+        return value
+
+
+def _snapshots(obj) -> List[Dict[str, Any]]:
+    """物件目前的欄位值；欄位被修改時再加上修改前的值（例如換房時原房間也要失效）"""
+    state = inspect(obj)
+    current = {attr.key: state.dict.get(attr.key) for attr in state.mapper.column_attrs}
+    previous = dict(current)
+    for key in current:
+        deleted = state.attrs[key].history.deleted
+        if deleted:
+            previous[key] = deleted[0]
+    return [current] if previous == current else [current, previous]
+
+
+def _pending(session: Session) -> set:
+    return session.info.setdefault(PENDING_TAGS_KEY, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_tags(session: Session, flush_context):
+    # 先略過沒有註冊標籤的 model，不必為無關的寫入走訪欄位與變更紀錄
+    changed = defaultdict(list)
+    for obj in session.new | session.deleted:
+        if type(obj) in _registry:
+            changed[type(obj)].extend(_snapshots(obj))
+    for obj in session.dirty:
+        if type(obj) in _registry and session.is_modified(obj, include_collections=False):
+            changed[type(obj)].extend(_snapshots(obj))
+
+    tags = _pending(session)
+    for model, rows in changed.items():
+        for build in _registry[model]:
+            try:
+                tags.update(build(session, rows))
+            except Exception as e:
+                # 無法判斷精確範圍時只記錄錯誤，快取仍會依 TTL 過期
+                logging.error(f"Error collecting cache tags for {model.__name__}: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    # savepoint 提交時外層交易仍可能 rollback，等最外層交易提交才清除
+    if session.in_nested_transaction():
+        return
+    tags = session.info.pop(PENDING_TAGS_KEY, None)
+    if tags:
+        invalidate_tags(*sorted(tags))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    # savepoint rollback 時保留已收集的標籤（多清除不影響正確性）
+    if session.in_nested_transaction():
+        return
+    session.info.pop(PENDING_TAGS_KEY, None)
+
+
+register(Rental, "room:{room_id}", "rental:{id}")
+register(Room, "estate:{estate_id}")
+
+
+@tag_builder(Rental)
+def _rental_estate_tags(session: Session, rows: List[Dict[str, Any]]) -> Iterable[str]:
+    """租約變更會影響所屬物業的房間 / 租客列表"""
+    room_ids = {row["room_id"] for row in rows if row["room_id"] is not None}
+    if not room_ids:
+        return []
+    estate_ids = session.execute(select(Room.estate_id).where(Room.id.in_(room_ids)).distinct()).scalars()
+    return [f"estate:{estate_id}" for estate_id in estate_ids if estate_id is not None]
+
+
+@tag_builder(User)
+def _tenant_estate_tags(session: Session, rows: List[Dict[str, Any]]) -> Iterable[str]:
+    """租客名稱顯示在物業的租客列表中"""
+    user_ids = {row["id"] for row in rows if row["id"] is not None}
+    if not user_ids:
+        return []
+    estate_ids = session.execute(
+        select(Room.estate_id)
+        .join(Rental, Rental.room_id == Room.id)
+        .where(Rental.user_id.in_(user_ids))
+        .distinct()
+    ).scalars()
+    return [f"estate:{estate_id}" for estate_id in estate_ids if estate_id is not None]
@@ -0,0 +1,158 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+# 各命名空間（快取鍵第一個 ":" 之前）的命中、未命中、錯誤、寫入次數與讀取延遲
+# 每個 worker 先在記憶體累計，定期以 HINCRBY 合併到 Redis，跨 worker 彙總
+CACHE_METRICS_ENABLED = os.getenv("CACHE_METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_METRICS_FLUSH_INTERVAL = float(os.getenv("CACHE_METRICS_FLUSH_INTERVAL", 5))
+# /cache/stats 每個命名空間以 MEMORY USAGE 抽樣的鍵數
+CACHE_METRICS_MEMORY_SAMPLES = int(os.getenv("CACHE_METRICS_MEMORY_SAMPLES", 20))
+
+METRICS_KEY_PREFIX = "cache:metrics:"
+NAMESPACES_KEY = "cache:metrics:namespaces"
+# 讀取延遲的直方圖上界（毫秒），最後一格為更慢的讀取
+LATENCY_BUCKETS_MS = [0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
+COUNTERS = ("hits", "local_hits", "misses", "errors", "sets")
+
+
+def namespace_of(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+def _metrics_key(namespace: str) -> str:
+    return f"{METRICS_KEY_PREFIX}{namespace}"
+
+
+class CacheMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._last_flush = time.monotonic()
+        self._flushing = False
+
+    def record_get(self, key: str, outcome: str, seconds: float):
+        """outcome 為 hits / local_hits / misses / errors"""
+        if not CACHE_METRICS_ENABLED:
+            return
+        bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            counters = self._pending[namespace_of(key)]
+            counters[outcome] += 1
+            if outcome == "local_hits":
+                counters["hits"] += 1
+            counters[f"lat_{bucket}"] += 1
+        self._flush_if_due()
+
+    def record_set(self, keys: Iterable[str], errors: bool = False):
+        if not CACHE_METRICS_ENABLED:
+            return
+        with self._lock:
+            for key in keys:
+                self._pending[namespace_of(key)]["errors" if errors else "sets"] += 1
+        self._flush_if_due()
+
+    def _flush_if_due(self):
+        """到期時在背景執行緒合併（record_* 會在事件迴圈中被呼叫，不能同步等待 Redis）"""
+        if time.monotonic() - self._last_flush < CACHE_METRICS_FLUSH_INTERVAL:
+            return
+        with self._lock:
+            if self._flushing:
+                return
+            self._flushing = True
+            self._last_flush = time.monotonic()
+        threading.Thread(target=self._background_flush, name="cache-metrics-flush", daemon=True).start()
+
+    def _background_flush(self):
+        try:
+            self.flush()
+        finally:
+            self._flushing = False
+
+    def flush(self):
+        """將本 worker 累計的數字合併到 Redis（單一 pipeline）"""
+        from utils.redis_config import redis_client, redis_available
+
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+            self._last_flush = time.monotonic()
+        if not pending or not redis_available(redis_client):
+            return
+
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.sadd(NAMESPACES_KEY, *pending.keys())
+            for namespace, counters in pending.items():
+                for field, value in counters.items():
+                    pipe.hincrby(_metrics_key(namespace), field, value)
+            pipe.execute()
+        except Exception as e:
+            # Redis 無法使用時捨棄這一批，不影響快取本身
+            logging.warning(f"Error flushing cache metrics: {e}")
+
+
+metrics = CacheMetrics()
+
+
+def _percentile(histogram: List[int], quantile: float) -> Optional[float]:
+    """以直方圖估計分位數（回傳所在區間的上界，最後一格回傳最大的上界）"""
+    total = sum(histogram)
+    if not total:
+        return None
+    threshold = total * quantile
+    running = 0
+    for index, count in enumerate(histogram):
+        running += count
+        if running >= threshold:
+            return LATENCY_BUCKETS_MS[min(index, len(LATENCY_BUCKETS_MS) - 1)]
+    return LATENCY_BUCKETS_MS[-1]
+
+
+def _sample_memory(redis_client, namespace: str) -> Dict[str, Any]:
+    """以 SCAN 取樣少量鍵並查詢 MEMORY USAGE（最多掃描 10 批，不會掃完整個 keyspace）"""
+    keys = []
+    cursor = 0
+    for _ in range(10):
+        cursor, batch = redis_client.scan(cursor, match=f"{namespace}:*", count=1000)
+        keys.extend(batch)
+        if len(keys) >= CACHE_METRICS_MEMORY_SAMPLES or cursor == 0:
+            break
+    keys = keys[:CACHE_METRICS_MEMORY_SAMPLES]
+    if not keys:
+        return {"sampled_keys": 0, "avg_bytes": None}
+
+    pipe = redis_client.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key)
+    sizes = [size for size in pipe.execute() if size is not None]
+    return {
+        "sampled_keys": len(sizes),
+        "avg_bytes": round(sum(sizes) / len(sizes)) if sizes else None,
+    }
+
+
+def namespace_stats(redis_client) -> Dict[str, Dict[str, Any]]:
+    """跨 worker 彙總後的各命名空間統計：命中率、p50/p99 讀取延遲與抽樣記憶體用量"""
+    metrics.flush()
+    namespaces = sorted(redis_client.smembers(NAMESPACES_KEY))
+    pipe = redis_client.pipeline(transaction=False)
+    for namespace in namespaces:
+        pipe.hgetall(_metrics_key(namespace))
+
+    stats = {}
+    for namespace, raw in zip(namespaces, pipe.execute()):
+        counters = {field: int(raw.get(field, 0)) for field in COUNTERS}
+        histogram = [int(raw.get(f"lat_{index}", 0)) for index in range(len(LATENCY_BUCKETS_MS) + 1)]
+        lookups = counters["hits"] + counters["misses"]
+        stats[namespace] = {
+            **counters,
+            "hit_ratio": round(counters["hits"] / lookups, 4) if lookups else None,
+            "p50_ms": _percentile(histogram, 0.5),
+            "p99_ms": _percentile(histogram, 0.99),
+            "memory": _sample_memory(redis_client, namespace),
+        }
+    return stats
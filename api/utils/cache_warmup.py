@@ -0,0 +1,153 @@
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict
+
+from database import SessionLocal
+from models.room import Room
+from models.rental import Rental
+from routes.rentals import get_rentals_by_room_status, get_payment_info_by_rental_id
+from routes.rooms import (
+    get_rooms_by_estate, get_rooms_with_tenants_by_estate, rooms_with_tenants_statement, rooms_with_tenants
+)
+from utils import redis_config
+from utils.payment_schedule import upcoming_dates
+
+tz = timezone(timedelta(hours=8))
+
+# 快取預熱：啟動時（背景執行）、清除全部快取後與排程（cron 語法）時執行
+CACHE_WARMUP_ENABLED = os.getenv("CACHE_WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_WARMUP_CRON = os.getenv("CACHE_WARMUP_CRON", "30 5 * * *")
+# 每批處理的物業數（每批各一次查詢房間、租約與租客）
+CACHE_WARMUP_BATCH_SIZE = int(os.getenv("CACHE_WARMUP_BATCH_SIZE", 20))
+
+STATUS_KEY = "cache:warmup:status"
+LOCK_KEY = "lock:cache:warmup"
+LOCK_TIMEOUT = 300
+
+
+def _report(**fields):
+    try:
+        redis_config.redis_client.hset(STATUS_KEY, mapping={key: str(value) for key, value in fields.items()})
+    except Exception as e:
+        logging.warning(f"Error reporting cache warm-up status: {e}")
+
+
+def get_warmup_status() -> Dict[str, str]:
+    return redis_config.redis_client.hgetall(STATUS_KEY)
+
+
+def _warm_batch(db, estate_ids, counts: Dict[str, int], timings: Dict[str, float]):
+    start = time.perf_counter()
+    rooms = db.query(Room).filter(Room.estate_id.in_(estate_ids), Room.deleted_at.is_(None)).order_by(Room.id).all()
+    room_ids = [room.id for room in rooms]
+    rentals = db.query(Rental).filter(
+        Rental.room_id.in_(room_ids),
+        Rental.status.in_(("active", "inactive"))
+    ).order_by(Rental.id).all() if room_ids else []
+    tenant_rows = db.execute(rooms_with_tenants_statement().where(Room.estate_id.in_(estate_ids))).all()
+    schedules = upcoming_dates(db, [rental.id for rental in rentals if rental.status == "active"])
+    timings["query_ms"] += (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    # rentals:room:{id}:status:{1|0}，沒有租約的房間也寫入空列表
+    by_room_status = {(room_id, status): [] for room_id in room_ids for status in (1, 0)}
+    for rental in rentals:
+        by_room_status[(rental.room_id, 1 if rental.status == "active" else 0)].append(rental)
+    counts["rental_lists"] += get_rentals_by_room_status.prime_many(
+        ({"room_id": room_id, "status": status}, items) for (room_id, status), items in by_room_status.items()
+    )
+
+    counts["payment_schedules"] += get_payment_info_by_rental_id.prime_many(
+        ({"rental_id": rental_id}, dates) for rental_id, dates in schedules.items()
+    )
+
+    rooms_by_estate = defaultdict(list)
+    for room in rooms:
+        rooms_by_estate[room.estate_id].append(room)
+    tenants_by_estate = defaultdict(list)
+    for row in tenant_rows:
+        tenants_by_estate[row.estate_id].append(row)
+    counts["room_lists"] += get_rooms_by_estate.prime_many(
+        ({"estate_id": estate_id}, rooms_by_estate[estate_id]) for estate_id in estate_ids
+    )
+    counts["tenant_lists"] += get_rooms_with_tenants_by_estate.prime_many(
+        ({"estate_id": estate_id}, rooms_with_tenants(tenants_by_estate[estate_id])) for estate_id in estate_ids
+    )
+    timings["write_ms"] += (time.perf_counter() - start) * 1000
+
+
+def warm_up_cache() -> Dict[str, Any]:
+    """
+    預先計算所有未刪除房間的租約列表、有效租約的繳費日期，以及各物業的房間 / 租客列表
+
+    以 Redis 鎖確保多個 worker 同時只有一個在執行；進度與耗時寫入 cache:warmup:status
+    """
+    if not CACHE_WARMUP_ENABLED or redis_config.redis_client is None:
+        return {"status": "disabled"}
+
+    try:
+        lock = redis_config.redis_client.lock(LOCK_KEY, timeout=LOCK_TIMEOUT)
+        if not lock.acquire(blocking=False):
+            return {"status": "skipped", "message": "Cache warm-up already running"}
+    except Exception as e:
+        logging.error(f"Cache warm-up could not acquire lock: {e}")
+        return {"status": "error", "message": str(e)}
+
+    started = time.perf_counter()
+    counts: Dict[str, int] = defaultdict(int)
+    timings: Dict[str, float] = defaultdict(float)
+    failed_batches = 0
+    db = SessionLocal()
+    try:
+        estate_ids = [
+            estate_id for (estate_id,) in db.query(Room.estate_id).filter(
+                Room.deleted_at.is_(None),
+                Room.estate_id.isnot(None)
+            ).distinct().order_by(Room.estate_id)
+        ]
+        redis_config.redis_client.delete(STATUS_KEY)
+        _report(state="running", started_at=datetime.now(tz).isoformat(), estates_total=len(estate_ids), estates_done=0)
+
+        for offset in range(0, len(estate_ids), CACHE_WARMUP_BATCH_SIZE):
+            batch = estate_ids[offset:offset + CACHE_WARMUP_BATCH_SIZE]
+            try:
+                _warm_batch(db, batch, counts, timings)
+            except Exception as e:
+                # 單一批次的資料有問題時略過，不影響其他物業
+                failed_batches += 1
+                logging.error(f"Cache warm-up failed for estates {batch}: {e}")
+            db.expunge_all()
+            lock.reacquire()
+            _report(estates_done=offset + len(batch), failed_batches=failed_batches, **counts)
+
+        result = {
+            "status": "success",
+            "estates": len(estate_ids),
+            "failed_batches": failed_batches,
+            **counts,
+            "query_ms": round(timings["query_ms"], 1),
+            "write_ms": round(timings["write_ms"], 1),
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        _report(state="done", finished_at=datetime.now(tz).isoformat(), **result)
+        logging.info(f"Cache warm-up completed: {result}")
+        return result
+    except Exception as e:
+        logging.error(f"Cache warm-up failed: {e}")
+        _report(state="failed", finished_at=datetime.now(tz).isoformat(), error=str(e))
+        return {"status": "error", "message": str(e)}
+    finally:
+        db.close()
+        try:
+            lock.release()
+        except Exception as e:
+            logging.warning(f"Error releasing cache warm-up lock: {e}")
+
+
+def start_cache_warmup():
+    """在背景執行緒執行預熱，不阻塞呼叫端"""
+    threading.Thread(target=warm_up_cache, name="cache-warmup", daemon=True).start()
@@ -0,0 +1,62 @@
+import time
+import logging
+import threading
+from typing import Any, Dict
+
+
+class CircuitBreaker:
+    """
+    連續失敗達門檻後開路，冷卻期間呼叫端直接略過外部服務
+
+    冷卻結束後每個冷卻週期只放行一次試探，成功即恢復、失敗則重新計時
+    """
+
+    def __init__(self, name: str, failure_threshold: int, cooldown: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.cooldown:
+                # 放行一次試探，並重新計時，避免同時放行大量請求
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        if self._failures == 0 and self._opened_at is None:
+            return
+        with self._lock:
+            if self._opened_at is not None:
+                logging.info(f"Circuit breaker {self.name} closed")
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logging.warning(
+                        f"Circuit breaker {self.name} opened after {self._failures} consecutive failures"
+                    )
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._opened_at is None:
+                return {"state": "closed", "consecutive_failures": self._failures}
+            retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+            return {
+                "state": "open",
+                "consecutive_failures": self._failures,
+                "retry_in_seconds": round(retry_in, 1),
+            }
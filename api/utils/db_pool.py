@@ -0,0 +1,170 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger("db.pool")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # 需小於 MySQL wait_timeout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_WAIT_WARN_MS = float(os.getenv("DB_POOL_WAIT_WARN_MS", 200))
+
+
+def pool_options() -> Dict[str, Any]:
+    """create_engine 使用的連接池參數"""
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+class PoolMetrics:
+    """單一連接池的統計資料（每個 worker 各自一份）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.connects = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.slow_waits = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self.overflow_checkouts = 0
+
+    def record_wait(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+            if wait_ms >= DB_POOL_WAIT_WARN_MS:
+                self.slow_waits += 1
+            if self.pool is not None:
+                checked_out = self.pool.checkedout()
+                overflow = max(self.pool.overflow(), 0)
+                self.peak_checked_out = max(self.peak_checked_out, checked_out)
+                self.peak_overflow = max(self.peak_overflow, overflow)
+                if overflow > 0 and not timed_out:
+                    self.overflow_checkouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            data = {
+                "name": self.name,
+                "pid": os.getpid(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_avg_ms": round(self.wait_total_ms / waits, 3) if waits else 0.0,
+                "wait_max_ms": round(self.wait_max_ms, 3),
+                "slow_waits": self.slow_waits,
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+                "overflow_checkouts": self.overflow_checkouts,
+            }
+        if self.pool is not None:
+            data.update({
+                "pool_size": self.pool.size(),
+                "checked_out": self.pool.checkedout(),
+                "checked_in": self.pool.checkedin(),
+                "overflow": max(self.pool.overflow(), 0),
+                "max_overflow": self.pool._max_overflow,
+            })
+        return data
+
+
+# 以連接池名稱索引的統計資料
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+class InstrumentedPoolMixin:
+    """在取得連線時量測等待時間的連接池 mixin"""
+
+    metrics: PoolMetrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            wait_ms = (time.perf_counter() - start) * 1000
+            if self.metrics is not None:
+                self.metrics.record_wait(wait_ms, timed_out=True)
+            logger.error(
+                f"DB pool '{self.metrics.name if self.metrics else '?'}' timed out after {wait_ms:.1f}ms "
+                f"(checked_out={self.checkedout()}, overflow={max(self.overflow(), 0)})"
+            )
+            raise
+        wait_ms = (time.perf_counter() - start) * 1000
+        if self.metrics is not None:
+            self.metrics.record_wait(wait_ms)
+            if wait_ms >= DB_POOL_WAIT_WARN_MS:
+                logger.warning(
+                    f"DB pool '{self.metrics.name}' slow checkout: waited {wait_ms:.1f}ms "
+                    f"(checked_out={self.checkedout()}, overflow={max(self.overflow(), 0)})"
+                )
+        return conn
+
+    def recreate(self):
+        new_pool = super().recreate()
+        new_pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = new_pool
+        return new_pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine, name: str) -> PoolMetrics:
+    """為 engine 的連接池註冊統計與日誌事件"""
+    metrics = PoolMetrics(name)
+    pool = engine.pool
+    pool.metrics = metrics
+    metrics.pool = pool
+    pool_metrics[name] = metrics
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        with metrics._lock:
+            metrics.connects += 1
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        with metrics._lock:
+            metrics.invalidations += 1
+        logger.warning(f"DB pool '{name}' invalidated a connection: {exception}")
+
+    return metrics
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """回傳本 worker 所有連接池的統計資料"""
+    return {name: metrics.snapshot() for name, metrics in pool_metrics.items()}
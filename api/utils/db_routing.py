@@ -0,0 +1,31 @@
+import random
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+
+class RoutingSession(Session):
+    """讀寫分離的 Session
+
+    use_replica 為 True 時，唯讀的 SELECT 會送往 replica；
+    寫入、flush、SELECT ... FOR UPDATE 以及任何寫入之後的查詢（寫後讀）都留在 primary。
+    """
+
+    def __init__(self, *args, replica_binds=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_binds = list(replica_binds)
+        self.use_replica = False
+        self._wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or (clause is not None and not isinstance(clause, Select)):
+            self._wrote = True
+        elif self._can_use_replica(clause):
+            return random.choice(self.replica_binds)
+        return super().get_bind(mapper, clause=clause, **kw)
+
+    def _can_use_replica(self, clause) -> bool:
+        if not self.use_replica or not self.replica_binds or self._wrote:
+            return False
+        if clause is None:
+            return False
+        return getattr(clause, "_for_update_arg", None) is None
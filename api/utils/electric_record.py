@@ -0,0 +1,104 @@
+from typing import Dict, List, Tuple
+from sqlalchemy import and_, func, or_, select, tuple_
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+from models.electric_record import ElectricRecord
+
+def period_index(year: int, month: int) -> int:
+    """期間以 年*12+月 表示，方便比較先後"""
+    return year * 12 + month
+
+
+def _upsert_statement(dialect_name: str, rows: List[dict]):
+    """組出 INSERT ... ON DUPLICATE KEY UPDATE（sqlite 為 ON CONFLICT DO UPDATE）"""
+    if dialect_name == "sqlite":
+        stmt = sqlite.insert(ElectricRecord).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=["room_id", "record_year", "record_month"],
+            set_={
+                "reading": stmt.excluded.reading,
+                "recorder_id": stmt.excluded.recorder_id,
+                "updated_at": func.now(),
+            }
+        )
+
+    stmt = mysql.insert(ElectricRecord).values(rows)
+    return stmt.on_duplicate_key_update(
+        reading=stmt.inserted.reading,
+        recorder_id=stmt.inserted.recorder_id,
+        updated_at=func.now()
+    )
+
+
+def upsert_electric_record(
+    db: Session,
+    room_id: int,
+    record_year: int,
+    record_month: int,
+    reading: float,
+    recorder_id: int = None
+) -> ElectricRecord:
+    """以單一 INSERT ... ON DUPLICATE KEY UPDATE 寫入某房某月的電表讀數（不 commit）"""
+    values = {
+        "room_id": room_id,
+        "record_year": record_year,
+        "record_month": record_month,
+        "reading": reading,
+        "recorder_id": recorder_id,
+    }
+    db.execute(_upsert_statement(db.get_bind().dialect.name, [values]))
+
+    # 重新讀取該筆（populate_existing 覆蓋 session 中的舊值）
+    return db.query(ElectricRecord).filter(
+        ElectricRecord.room_id == room_id,
+        ElectricRecord.record_year == record_year,
+        ElectricRecord.record_month == record_month
+    ).populate_existing().one()
+
+
+def bulk_upsert_electric_records(db: Session, rows: List[dict]) -> Dict[Tuple[int, int, int], int]:
+    """一次寫入多筆讀數（不 commit），回傳 (room_id, 年, 月) -> 記錄 ID"""
+    if not rows:
+        return {}
+    db.execute(_upsert_statement(db.get_bind().dialect.name, rows))
+
+    keys = [(row["room_id"], row["record_year"], row["record_month"]) for row in rows]
+    result = db.execute(
+        select(ElectricRecord.id, ElectricRecord.room_id, ElectricRecord.record_year, ElectricRecord.record_month)
+        .where(tuple_(ElectricRecord.room_id, ElectricRecord.record_year, ElectricRecord.record_month).in_(keys))
+    )
+    return {(room_id, year, month): record_id for record_id, room_id, year, month in result}
+
+
+def previous_readings(db: Session, room_ids: List[int], year: int, month: int) -> Dict[int, Tuple[int, float]]:
+    """以單一 window function 查詢取得各房間在指定年月之前的最近一筆讀數，回傳 room_id -> (期間, 讀數)"""
+    if not room_ids:
+        return {}
+    ranked = (
+        select(
+            ElectricRecord.room_id,
+            ElectricRecord.record_year,
+            ElectricRecord.record_month,
+            ElectricRecord.reading,
+            func.row_number().over(
+                partition_by=ElectricRecord.room_id,
+                order_by=(ElectricRecord.record_year.desc(), ElectricRecord.record_month.desc())
+            ).label("rn")
+        )
+        .where(
+            ElectricRecord.room_id.in_(room_ids),
+            or_(
+                ElectricRecord.record_year < year,
+                and_(ElectricRecord.record_year == year, ElectricRecord.record_month < month)
+            )
+        )
+        .subquery()
+    )
+    result = db.execute(
+        select(ranked.c.room_id, ranked.c.record_year, ranked.c.record_month, ranked.c.reading)
+        .where(ranked.c.rn == 1)
+    )
+    return {
+        room_id: (period_index(record_year, record_month), reading)
+        for room_id, record_year, record_month, reading in result
+    }
@@ -0,0 +1,101 @@
+import os
+import time
+import fnmatch
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# 每個 worker 行程內的 L1 快取（位於 Redis 之前），跨 worker 的一致性由 Redis pub/sub 失效訊息維持
+LOCAL_CACHE_ENABLED = os.getenv("LOCAL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LOCAL_CACHE_TTL = float(os.getenv("LOCAL_CACHE_TTL", 30))
+LOCAL_CACHE_MAX_BYTES = int(os.getenv("LOCAL_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+LOCAL_CACHE_MAX_ENTRIES = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", 10000))
+
+MISSING = object()
+
+
+class LocalCache:
+    """以位元組數與筆數為上限的 LRU，每筆資料有各自的過期時間"""
+
+    def __init__(self, max_bytes: int, max_entries: int, default_ttl: float):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # 每次失效都遞增；讀取 Redis 前後世代不同時不寫入，避免把剛失效的舊值放回 L1
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        """回傳快取值，未命中或已過期時回傳 MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, size: int, ttl: Optional[float] = None, generation: Optional[int] = None):
+        """size 為序列化後的位元組數；超過上限時淘汰最久未使用的資料"""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, keys: Iterable[str]):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._remove(key)
+
+    def delete_pattern(self, pattern: str):
+        """以 glob 模式（與 Redis 相同語法）刪除"""
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+local_cache = LocalCache(LOCAL_CACHE_MAX_BYTES, LOCAL_CACHE_MAX_ENTRIES, LOCAL_CACHE_TTL)
@@ -0,0 +1,103 @@
+import json
+import base64
+import binascii
+from datetime import datetime, date
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, false
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class SortKey:
+    """Keyset 分頁的排序欄位與方向，最後一個欄位必須唯一（通常是 id）"""
+
+    def __init__(self, column, descending: bool = False):
+        self.column = column
+        self.descending = descending
+        self.nullable = getattr(column.expression, "nullable", True)
+
+    @property
+    def name(self) -> str:
+        return self.column.key
+
+    def order_by(self):
+        return self.column.desc() if self.descending else self.column.asc()
+
+    def equals(self, value):
+        if value is None:
+            return self.column.is_(None)
+        return self.column == value
+
+    def after(self, value):
+        """排在 value 之後的條件（MySQL 中 NULL 視為最小值）"""
+        if value is None:
+            return false() if self.descending else self.column.isnot(None)
+        if self.descending:
+            condition = self.column < value
+            return or_(condition, self.column.is_(None)) if self.nullable else condition
+        return self.column > value
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """將排序欄位的值編碼成不透明的 cursor 字串"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("cursor size mismatch")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset(query, keys: Sequence[SortKey], cursor: Optional[str] = None, skip: int = 0):
+    """為 Query / Select 加上 keyset 排序與過濾；未提供 cursor 時沿用 skip（offset）"""
+    query = query.order_by(*[key.order_by() for key in keys])
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        conditions = []
+        for index, key in enumerate(keys):
+            prefix = [keys[i].equals(values[i]) for i in range(index)]
+            conditions.append(and_(*prefix, key.after(values[index])))
+        query = query.filter(or_(*conditions))
+    elif skip:
+        query = query.offset(skip)
+    return query
+
+
+def next_cursor(items: Sequence[Any], keys: Sequence[SortKey], limit: int) -> Optional[str]:
+    """以最後一筆資料產生下一頁的 cursor，資料不足一頁時回傳 None"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor([getattr(last, key.name) for key in keys])
+
+
+def set_next_cursor(response: Response, items: Sequence[Any], keys: Sequence[SortKey], limit: int):
+    """將下一頁的 cursor 放入回應標頭，保持回應主體與舊版相容"""
+    cursor = next_cursor(items, keys, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
@@ -0,0 +1,94 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import delete, insert, inspect, select
+from sqlalchemy.orm import Session
+from models.rental import Rental
+from models.rental_payment_schedule import RentalPaymentSchedule
+
+PAYMENT_INTERVALS = {
+    "月繳": relativedelta(months=1),
+    "季繳": relativedelta(months=3),
+    "半年": relativedelta(months=6),
+    "年繳": relativedelta(years=1),
+}
+PENDING = "pending"
+# 影響繳費日期的租約欄位（繳費週期由 rental_info 同步）
+SCHEDULE_FIELDS = ("start_date", "end_date", "rental_info", "status")
+
+
+def schedule_dates(rental: Rental) -> List[date]:
+    """依繳費週期展開租期內（起租日到到期日）的所有繳費日期"""
+    interval = PAYMENT_INTERVALS.get(rental.payment_frequency)
+    if interval is None or rental.start_date is None or rental.end_date is None:
+        return []
+
+    dates = []
+    next_payment = rental.start_date
+    while next_payment <= rental.end_date:
+        dates.append(next_payment)
+        next_payment += interval
+    return dates
+
+
+def schedule_changed(rental: Rental) -> bool:
+    """有效租約的起訖日、繳費週期或狀態在目前交易中被修改，需要重新產生繳費日期"""
+    if rental.status != "active":
+        return False
+    state = inspect(rental)
+    return any(state.attrs[field].history.has_changes() for field in SCHEDULE_FIELDS)
+
+
+def sync_payment_schedule(db: Session, rentals: Iterable[Rental]) -> int:
+    """重新產生租約的待繳日期（已有其他狀態的日期保留不動），回傳新增筆數（不 commit）"""
+    rentals = [rental for rental in rentals if rental.id is not None]
+    if not rentals:
+        return 0
+    table = RentalPaymentSchedule.__table__
+    rental_ids = [rental.id for rental in rentals]
+
+    db.execute(delete(table).where(table.c.rental_id.in_(rental_ids), table.c.status == PENDING))
+    kept = defaultdict(set)
+    for rental_id, due_date in db.execute(
+        select(table.c.rental_id, table.c.due_date).where(table.c.rental_id.in_(rental_ids))
+    ):
+        kept[rental_id].add(due_date)
+
+    rows = [
+        {"rental_id": rental.id, "due_date": due_date, "status": PENDING}
+        for rental in rentals
+        for due_date in schedule_dates(rental)
+        if due_date not in kept[rental.id]
+    ]
+    if rows:
+        db.execute(insert(table), rows)
+    return len(rows)
+
+
+def truncate_payment_schedule(db: Session, rental_id: int, last_date: date):
+    """退租時刪除退租日之後的待繳日期（不 commit）"""
+    table = RentalPaymentSchedule.__table__
+    db.execute(
+        delete(table).where(
+            table.c.rental_id == rental_id,
+            table.c.due_date > last_date,
+            table.c.status == PENDING
+        )
+    )
+
+
+def upcoming_dates(db: Session, rental_ids: List[int], today: Optional[date] = None) -> Dict[int, List[date]]:
+    """各租約今天（含）之後的繳費日期，一次查詢多個租約"""
+    today = today or datetime.now().date()
+    result = {rental_id: [] for rental_id in rental_ids}
+    if not rental_ids:
+        return result
+    for rental_id, due_date in db.execute(
+        select(RentalPaymentSchedule.rental_id, RentalPaymentSchedule.due_date).where(
+            RentalPaymentSchedule.rental_id.in_(rental_ids),
+            RentalPaymentSchedule.due_date >= today
+        ).order_by(RentalPaymentSchedule.rental_id, RentalPaymentSchedule.due_date)
+    ):
+        result[rental_id].append(due_date)
+    return result
@@ -0,0 +1,67 @@
+import os
+from typing import Any, Dict, Optional
+from models.auth import AuthUser
+from utils.redis_config import get_cache, set_cache, delete_cache, aget_cache, aset_cache
+
+# 驗證用的使用者資料快取：行程內 L1（utils.local_cache）→ Redis（L2）→ 資料庫
+PRINCIPAL_CACHE_ENABLED = os.getenv("PRINCIPAL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", 300))
+# L1 的存活時間（其他 worker 收不到失效訊息時最多保留這麼久）
+PRINCIPAL_CACHE_LOCAL_TTL = float(os.getenv("PRINCIPAL_CACHE_LOCAL_TTL", 30))
+
+# 只快取驗證與權限判斷需要的欄位（個資欄位不進 Redis 與 L1），完整資料由 get_current_full_user 查詢
+_PRINCIPAL_FIELDS = ("id", "email", "role", "name", "is_active", "token_version")
+
+
+def _cache_key(user_id: int) -> str:
+    return f"auth:principal:{user_id}"
+
+
+def _to_data(user: AuthUser) -> Dict[str, Any]:
+    return {field: getattr(user, field) for field in _PRINCIPAL_FIELDS}
+
+
+def _from_data(data: Dict[str, Any]) -> AuthUser:
+    """以快取資料建立（不屬於任何 session、只有驗證欄位的）AuthUser"""
+    user = AuthUser(**{field: data.get(field) for field in _PRINCIPAL_FIELDS})
+    user.partial = True
+    return user
+
+
+def get_principal(user_id: int) -> Optional[AuthUser]:
+    """依序從 L1、Redis 取得使用者，皆未命中時回傳 None"""
+    if not PRINCIPAL_CACHE_ENABLED or user_id is None:
+        return None
+
+    data = get_cache(_cache_key(user_id), local_ttl=PRINCIPAL_CACHE_LOCAL_TTL)
+    if data is None:
+        return None
+    return _from_data(data)
+
+
+async def aget_principal(user_id: int) -> Optional[AuthUser]:
+    """get_principal 的非同步版本（驗證相依性使用，不阻塞事件迴圈）"""
+    if not PRINCIPAL_CACHE_ENABLED or user_id is None:
+        return None
+
+    data = await aget_cache(_cache_key(user_id), local_ttl=PRINCIPAL_CACHE_LOCAL_TTL)
+    if data is None:
+        return None
+    return _from_data(data)
+
+
+def set_principal(user: AuthUser):
+    if not PRINCIPAL_CACHE_ENABLED:
+        return
+    set_cache(_cache_key(user.id), _to_data(user), ttl=PRINCIPAL_CACHE_TTL, local_ttl=PRINCIPAL_CACHE_LOCAL_TTL)
+
+
+async def aset_principal(user: AuthUser):
+    if not PRINCIPAL_CACHE_ENABLED:
+        return
+    await aset_cache(_cache_key(user.id), _to_data(user), ttl=PRINCIPAL_CACHE_TTL, local_ttl=PRINCIPAL_CACHE_LOCAL_TTL)
+
+
+def invalidate_principal(user_id: int):
+    """使用者資料變更（更新、停用、刪除、登入）後呼叫，其他 worker 的 L1 由失效訊息清除"""
+    delete_cache(_cache_key(user_id))
@@ -0,0 +1,167 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger("db.query_stats")
+
+# 同一請求中相同（正規化後）語句重複超過此次數即視為可能的 N+1
+SQL_REPEAT_WARN_THRESHOLD = int(os.getenv("SQL_REPEAT_WARN_THRESHOLD", 10))
+# 是否在回應中加入 X-DB-Queries / Server-Timing 標頭
+SQL_STATS_HEADERS = os.getenv("SQL_STATS_HEADERS", "true").lower() in ("1", "true", "yes")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):\w+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+
+def normalize_statement(statement: str) -> str:
+    """將 SQL 正規化（去除常數與參數），以便比對重複的語句"""
+    normalized = _WHITESPACE_RE.sub(" ", statement).strip()
+    normalized = _STRING_RE.sub("?", normalized)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _PLACEHOLDER_RE.sub("?", normalized)
+    return _IN_LIST_RE.sub("(...)", normalized)
+
+
+class QueryStats:
+    """單一請求（或一段測試程式碼）的 SQL 統計"""
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def route(self) -> Optional[str]:
+        """請求的方法與路由樣板（路由比對前則為實際路徑）"""
+        if self.scope is None:
+            return None
+        route = self.scope.get("route")
+        path = getattr(route, "path", None) or self.scope.get("path")
+        return f"{self.scope.get('method')} {path}"
+
+    def record(self, statement: str, duration_ms: float):
+        normalized = normalize_statement(statement)
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            self.statements[normalized] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """回傳重複次數超過 threshold 的語句"""
+        return [(stmt, n) for stmt, n in self.statements.most_common() if n > threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+# 跨執行緒的觀察者（測試用），TestClient 會在另一個執行緒中執行 app
+_observers: List[QueryStats] = []
+_observers_lock = threading.Lock()
+
+
+def get_current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration_ms)
+    if _observers:
+        with _observers_lock:
+            for observer in _observers:
+                observer.record(statement, duration_ms)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+class QueryStatsMiddleware:
+    """統計每個請求的 SQL 數量與耗時，並偵測重複語句（N+1）"""
+
+    def __init__(self, app, threshold: int = SQL_REPEAT_WARN_THRESHOLD, headers: bool = SQL_STATS_HEADERS):
+        self.app = app
+        self.threshold = threshold
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(scope)
+        token = _current_stats.set(stats)
+
+        async def send_wrapper(message):
+            if self.headers and message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Queries", str(stats.count))
+                headers.append("Server-Timing", f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_stats.reset(token)
+            for statement, count in stats.repeated(self.threshold):
+                logger.warning(
+                    f"Possible N+1 in {stats.route}: "
+                    f"statement executed {count} times: {statement[:300]}"
+                )
+
+
+@contextmanager
+def count_queries():
+    """統計區塊內所有執行緒執行的 SQL（供測試使用）"""
+    stats = QueryStats()
+    with _observers_lock:
+        _observers.append(stats)
+    try:
+        yield stats
+    finally:
+        with _observers_lock:
+            _observers.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    """斷言區塊內執行的 SQL 不超過 max_queries 條
+
+    用法::
+
+        with assert_max_queries(3):
+            client.get("/rooms/estate/1/with-tenants", headers=headers)
+    """
+    with count_queries() as stats:
+        yield stats
+    assert stats.count <= max_queries, (
+        f"Expected at most {max_queries} queries, got {stats.count}:\n"
+        + "\n".join(f"{n}x {stmt}" for stmt, n in stats.statements.most_common())
+    )
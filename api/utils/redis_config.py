@@ -1,83 +1,688 @@
 import redis
+import redis.asyncio as aioredis
 import os
 import json
+import time
+import asyncio
+import inspect
 import logging
-from typing import Any, Optional
+import functools
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+from pydantic import TypeAdapter
+from utils.local_cache import LOCAL_CACHE_ENABLED, MISSING, local_cache
+from utils.cache_codec import encode_sized, decode
+from utils.cache_metrics import metrics
+from utils.circuit_breaker import CircuitBreaker
 
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
+# 連接池大小與逾時（秒）；Redis 無法連線時每次呼叫最多等待這麼久
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 0.5))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 0.5))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", 30))
+# 連續失敗次數達門檻後，冷卻期間（秒）不再連線 Redis
+REDIS_BREAKER_THRESHOLD = int(os.getenv("REDIS_BREAKER_THRESHOLD", 5))
+REDIS_BREAKER_COOLDOWN = float(os.getenv("REDIS_BREAKER_COOLDOWN", 30))
 
 DEFAULT_CACHE_TTL = 3600  # 1小時
+# 標籤集合（tag:{標籤}）記錄掛在該標籤下的快取鍵，例如 room:{id}、rental:{id}
+TAG_KEY_PREFIX = "tag:"
+# SCAN / UNLINK 每批處理的鍵數
+SCAN_BATCH_SIZE = 1000
+# @cached 重新計算時的鎖存活時間（秒），其他請求最多等待這麼久
+CACHE_LOCK_TIMEOUT = float(os.getenv("CACHE_LOCK_TIMEOUT", 10))
+CACHE_LOCK_POLL_INTERVAL = 0.05
+# 同時在 threadpool 中等待其他請求重新計算的同步路由上限，超過的請求直接查詢，不佔住 threadpool
+CACHE_SYNC_MAX_WAITERS = int(os.getenv("CACHE_SYNC_MAX_WAITERS", 4))
+# 每個 @cached 路由保留的已驗證結果（Pydantic 物件）筆數
+CACHE_VALIDATED_MAX_ENTRIES = int(os.getenv("CACHE_VALIDATED_MAX_ENTRIES", 256))
+# 各 worker 的 L1 快取失效訊息頻道
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+# 快取值編碼前後的累計位元組數（/cache/stats 顯示節省量）
+CODEC_STATS_KEY = "cache:codec:stats"
+
+_CONNECTION_OPTIONS = {
+    "host": REDIS_HOST,
+    "port": REDIS_PORT,
+    "db": REDIS_DB,
+    "password": REDIS_PASSWORD,
+    "max_connections": REDIS_MAX_CONNECTIONS,
+    "socket_timeout": REDIS_SOCKET_TIMEOUT,
+    "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+    "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+}
+# 視為 Redis 無法使用（計入斷路器）的錯誤
+REDIS_CONNECTION_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)
+
+redis_breaker = CircuitBreaker("redis", REDIS_BREAKER_THRESHOLD, REDIS_BREAKER_COOLDOWN)
 
 # 建立Redis連接池
 try:
     redis_client = redis.Redis(
-        host=REDIS_HOST,
-        port=REDIS_PORT,
-        db=REDIS_DB,
-        password=REDIS_PASSWORD,
         decode_responses=True,  # 自動將byte轉為字串
+        **_CONNECTION_OPTIONS
     )
     logging.info(f"Redis connection established to {REDIS_HOST}:{REDIS_PORT}")
+    # 快取值使用獨立的二進位連線池（不自動解碼，值經 utils.cache_codec 編碼）
+    redis_binary_client = redis.Redis(**_CONNECTION_OPTIONS)
 except Exception as e:
     logging.error(f"Failed to connect to Redis: {e}")
     redis_client = None
+    redis_binary_client = None
+
+# redis.asyncio 的連線綁定在建立它的事件迴圈上，每個事件迴圈各自一個連接池
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aioredis.Redis]" = weakref.WeakKeyDictionary()
+
+
+def get_async_redis() -> aioredis.Redis:
+    """目前事件迴圈的非同步（二進位）Redis 客戶端"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = aioredis.Redis(**_CONNECTION_OPTIONS)
+        _async_clients[loop] = client
+    return client
+
+
+def redis_available(client=None) -> bool:
+    """Redis 已設定且斷路器未開路"""
+    if client is None:
+        client = redis_binary_client
+    return client is not None and redis_breaker.allow()
+
 
+def record_redis_error(e: Exception, message: str):
+    if isinstance(e, REDIS_CONNECTION_ERRORS):
+        redis_breaker.record_failure()
+    logging.error(f"{message}: {e}")
 
-def get_cache(key: str) -> Optional[Any]:
-    """從Redis獲取快取資料，並自動反序列化JSON"""
-    if redis_client is None:
+
+def get_cache(key: str, local_ttl: Optional[float] = None) -> Optional[Any]:
+    """
+    先查行程內 L1，未命中再從Redis獲取快取資料並自動解碼
+
+    回傳的物件與 L1 共用，呼叫端不可修改；Redis 無法使用時 L1 仍在其 TTL 內提供資料
+    """
+    start = time.perf_counter()
+    value = _local_get(key, start)
+    if value is not MISSING:
+        return value
+    if not redis_available():
         return None
 
     try:
-        data = redis_client.get(key)
-        if data:
-            return json.loads(data)
+        generation = local_cache.generation
+        data = redis_binary_client.get(key)
+        redis_breaker.record_success()
+        return _accept(key, data, generation, local_ttl, start)
+    except Exception as e:
+        metrics.record_get(key, "errors", time.perf_counter() - start)
+        record_redis_error(e, "Error getting data from Redis cache")
         return None
+
+
+async def aget_cache(key: str, local_ttl: Optional[float] = None) -> Optional[Any]:
+    """get_cache 的非同步版本（不阻塞事件迴圈）"""
+    start = time.perf_counter()
+    value = _local_get(key, start)
+    if value is not MISSING:
+        return value
+    if not redis_available():
+        return None
+
+    try:
+        generation = local_cache.generation
+        data = await get_async_redis().get(key)
+        redis_breaker.record_success()
+        return _accept(key, data, generation, local_ttl, start)
     except Exception as e:
-        logging.error(f"Error getting data from Redis cache: {e}")
+        metrics.record_get(key, "errors", time.perf_counter() - start)
+        record_redis_error(e, "Error getting data from Redis cache")
+        return None
+
+
+def _local_get(key: str, start: float) -> Any:
+    if not LOCAL_CACHE_ENABLED:
+        return MISSING
+    value = local_cache.get(key)
+    if value is not MISSING:
+        metrics.record_get(key, "local_hits", time.perf_counter() - start)
+    return value
+
+
+def _accept(key: str, data: Optional[bytes], generation: int, local_ttl: Optional[float], start: float) -> Optional[Any]:
+    """解碼 Redis 回傳的資料並放入 L1"""
+    if not data:
+        metrics.record_get(key, "misses", time.perf_counter() - start)
         return None
+    value = decode(data)
+    if LOCAL_CACHE_ENABLED:
+        local_cache.set(key, value, len(data), ttl=local_ttl, generation=generation)
+    metrics.record_get(key, "hits", time.perf_counter() - start)
+    return value
+
+
+def get_many(keys: Iterable[str], local_ttl: Optional[float] = None) -> Dict[str, Any]:
+    """一次取得多個快取（L1 未命中的部分以單次 MGET 取得），只回傳命中的鍵"""
+    keys = list(dict.fromkeys(keys))
+    found = {}
+    start = time.perf_counter()
+    for key in keys:
+        value = _local_get(key, start)
+        if value is not MISSING:
+            found[key] = value
+    remaining = [key for key in keys if key not in found]
+    if not remaining or not redis_available():
+        return found
+
+    try:
+        generation = local_cache.generation
+        values = redis_binary_client.mget(remaining)
+        redis_breaker.record_success()
+        # MGET 的延遲由同一批的每個鍵共同分攤
+        for key, data in zip(remaining, values):
+            value = _accept(key, data, generation, local_ttl, start)
+            if value is not None:
+                found[key] = value
+        return found
+    except Exception as e:
+        for key in remaining:
+            metrics.record_get(key, "errors", time.perf_counter() - start)
+        record_redis_error(e, "Error getting multiple keys from Redis cache")
+        return found
+
+
+def tag_key(tag: str) -> str:
+    return f"{TAG_KEY_PREFIX}{tag}"
+
+
+def _prepare_sets(
+    items: Mapping[str, Any],
+    ttl: int,
+    tags: Mapping[str, Iterable[str]],
+    local_ttl: Optional[float]
+) -> List[Tuple[str, bytes, int, Iterable[str]]]:
+    """編碼並寫入 L1，回傳 (鍵, 編碼後資料, 壓縮前位元組數, 標籤)"""
+    prepared = []
+    for key, value in items.items():
+        data, raw_size = encode_sized(value)
+        if LOCAL_CACHE_ENABLED:
+            local = local_cache.default_ttl if local_ttl is None else local_ttl
+            local_cache.set(key, value, len(data), ttl=min(local, ttl))
+        prepared.append((key, data, raw_size, tags.get(key, ())))
+    return prepared
 
 
-def set_cache(key: str, value: Any, ttl: int = DEFAULT_CACHE_TTL) -> bool:
-    """將資料存入Redis並序列化為JSON，設定過期時間"""
-    if redis_client is None:
+def _queue_sets(pipe, prepared, ttl: int):
+    """把 SET、標籤登記與編碼統計加入 pipeline"""
+    for key, data, _, item_tags in prepared:
+        pipe.set(key, data, ex=ttl)
+        for tag in item_tags:
+            # 標籤集合的存活時間取其下快取鍵中最長的
+            pipe.sadd(tag_key(tag), key)
+            pipe.expire(tag_key(tag), ttl, nx=True)
+            pipe.expire(tag_key(tag), ttl, gt=True)
+    pipe.hincrby(CODEC_STATS_KEY, "raw_bytes", sum(raw_size for _, _, raw_size, _ in prepared))
+    pipe.hincrby(CODEC_STATS_KEY, "stored_bytes", sum(len(data) for _, data, _, _ in prepared))
+
+
+def set_cache(
+    key: str,
+    value: Any,
+    ttl: int = DEFAULT_CACHE_TTL,
+    tags: Iterable[str] = (),
+    local_ttl: Optional[float] = None
+) -> bool:
+    """將資料編碼後存入 L1 與 Redis，設定過期時間，並登記到各標籤集合"""
+    return set_many({key: value}, ttl, {key: tags}, local_ttl)
+
+
+def set_many(
+    items: Mapping[str, Any],
+    ttl: int = DEFAULT_CACHE_TTL,
+    tags: Optional[Mapping[str, Iterable[str]]] = None,
+    local_ttl: Optional[float] = None
+) -> bool:
+    """以單一 pipeline 寫入多個快取；tags 為各鍵的標籤"""
+    prepared = _prepare_sets(items, ttl, tags or {}, local_ttl)
+    if not redis_available():
         return False
 
     try:
-        serialized_value = json.dumps(value)
-        redis_client.set(key, serialized_value, ex=ttl)
+        pipe = redis_binary_client.pipeline(transaction=False)
+        _queue_sets(pipe, prepared, ttl)
+        pipe.execute()
+        redis_breaker.record_success()
+        metrics.record_set(items.keys())
         return True
     except Exception as e:
-        logging.error(f"Error setting data to Redis cache: {e}")
+        metrics.record_set(items.keys(), errors=True)
+        record_redis_error(e, "Error setting data to Redis cache")
         return False
 
 
+async def aset_cache(
+    key: str,
+    value: Any,
+    ttl: int = DEFAULT_CACHE_TTL,
+    tags: Iterable[str] = (),
+    local_ttl: Optional[float] = None
+) -> bool:
+    """set_cache 的非同步版本（不阻塞事件迴圈）"""
+    prepared = _prepare_sets({key: value}, ttl, {key: tags}, local_ttl)
+    if not redis_available():
+        return False
+
+    try:
+        pipe = get_async_redis().pipeline(transaction=False)
+        _queue_sets(pipe, prepared, ttl)
+        await pipe.execute()
+        redis_breaker.record_success()
+        metrics.record_set([key])
+        return True
+    except Exception as e:
+        metrics.record_set([key], errors=True)
+        record_redis_error(e, "Error setting data to Redis cache")
+        return False
+
+
+def publish_invalidation(keys: Iterable[str] = (), pattern: Optional[str] = None):
+    """刪除本行程 L1 中的資料，並通知其他 worker 刪除"""
+    keys = list(keys)
+    if pattern is not None:
+        local_cache.delete_pattern(pattern)
+    else:
+        local_cache.delete(keys)
+    if (not keys and pattern is None) or not redis_available(redis_client):
+        return
+
+    try:
+        message = {"pattern": pattern} if pattern is not None else {"keys": keys}
+        redis_client.publish(CACHE_INVALIDATION_CHANNEL, json.dumps(message))
+    except Exception as e:
+        record_redis_error(e, "Error publishing cache invalidation")
+
+
+def _handle_invalidation(data: str):
+    message = json.loads(data)
+    if "pattern" in message:
+        local_cache.delete_pattern(message["pattern"])
+    else:
+        local_cache.delete(message.get("keys", []))
+
+
+def _listen_invalidations():
+    # 訂閱連線會長時間閒置，不套用一般指令的 socket_timeout
+    options = {**_CONNECTION_OPTIONS, "socket_timeout": None, "max_connections": None}
+    subscriber = redis.Redis(decode_responses=True, **options)
+    backoff = 1
+    while True:
+        try:
+            pubsub = subscriber.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            # 斷線期間可能漏掉失效訊息，重新訂閱後清空 L1
+            local_cache.clear()
+            backoff = 1
+            for message in pubsub.listen():
+                if message.get("type") == "message":
+                    _handle_invalidation(message["data"])
+        except Exception as e:
+            logging.warning(f"Cache invalidation listener disconnected: {e}")
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 30)
+
+
+_listener_thread: Optional[threading.Thread] = None
+
+
+def start_invalidation_listener():
+    """在背景執行緒訂閱失效頻道（每個 worker 啟動時呼叫一次）"""
+    global _listener_thread
+    if not LOCAL_CACHE_ENABLED or redis_client is None or _listener_thread is not None:
+        return
+    _listener_thread = threading.Thread(target=_listen_invalidations, name="cache-invalidation", daemon=True)
+    _listener_thread.start()
+
+
 def delete_cache(key: str) -> bool:
     """刪除Redis中的快取"""
-    if redis_client is None:
+    publish_invalidation([key])
+    if not redis_available(redis_client):
         return False
 
     try:
         redis_client.delete(key)
+        redis_breaker.record_success()
         return True
     except Exception as e:
-        logging.error(f"Error deleting data from Redis cache: {e}")
+        record_redis_error(e, "Error deleting data from Redis cache")
         return False
 
 
-def delete_pattern(pattern: str) -> bool:
-    """刪除符合模式的所有快取"""
-    if redis_client is None:
-        return False
+def _unlink(keys: Iterable[str]) -> int:
+    """分批以 UNLINK（背景釋放記憶體）刪除鍵"""
+    keys = list(keys)
+    if not keys:
+        return 0
+    pipe = redis_client.pipeline(transaction=False)
+    for start in range(0, len(keys), SCAN_BATCH_SIZE):
+        pipe.unlink(*keys[start:start + SCAN_BATCH_SIZE])
+    return sum(pipe.execute())
+
+
+def invalidate_tags(*tags: str) -> int:
+    """刪除掛在這些標籤下的所有快取，成本只與標籤下的鍵數有關，回傳刪除的快取數"""
+    if not tags:
+        return 0
+    if not redis_available(redis_client):
+        # 只能經由 Redis 的標籤集合找到對應的鍵，改為清空本行程的 L1，避免寫入後讀到舊值
+        local_cache.clear()
+        return 0
 
     try:
-        keys = redis_client.keys(pattern)
-        if keys:
-            redis_client.delete(*keys)
+        # 讀取與刪除標籤集合在同一個 MULTI/EXEC 中，之間並行寫入的鍵不會遺失標籤
+        pipe = redis_client.pipeline(transaction=True)
+        for tag in tags:
+            pipe.smembers(tag_key(tag))
+        pipe.unlink(*(tag_key(tag) for tag in tags))
+        members = set().union(*pipe.execute()[:-1])
+        deleted = _unlink(members)
+        redis_breaker.record_success()
+        publish_invalidation(members)
+        return deleted
+    except Exception as e:
+        record_redis_error(e, f"Error invalidating cache tags {tags}")
+        local_cache.clear()
+        return 0
+
+
+def scan_keys(pattern: str) -> Iterable[str]:
+    """以 SCAN 逐批列出符合模式的鍵（不會像 KEYS 一樣阻塞 Redis）"""
+    return redis_client.scan_iter(match=pattern, count=SCAN_BATCH_SIZE)
+
+
+def delete_pattern(pattern: str, exclude_prefixes: Tuple[str, ...] = ()) -> int:
+    """刪除符合模式的所有快取（管理用的批次清除，可略過特定前綴），回傳刪除的數量"""
+    publish_invalidation(pattern=pattern)
+    if not redis_available(redis_client):
+        return 0
+
+    try:
+        deleted = 0
+        batch = []
+        for key in scan_keys(pattern):
+            if key.startswith(exclude_prefixes):
+                continue
+            batch.append(key)
+            if len(batch) >= SCAN_BATCH_SIZE:
+                deleted += _unlink(batch)
+                batch = []
+        return deleted + _unlink(batch)
+    except Exception as e:
+        record_redis_error(e, "Error deleting pattern from Redis cache")
+        return 0
+
+
+def _acquire_lock(cache_key: str):
+    """以 SET NX 取得重新計算的鎖；已被其他請求持有時回傳 None，Redis 無法使用時回傳 True（直接計算）"""
+    if not redis_available(redis_client):
+        return True
+    try:
+        lock = redis_client.lock(f"lock:{cache_key}", timeout=CACHE_LOCK_TIMEOUT)
+        return lock if lock.acquire(blocking=False) else None
+    except Exception as e:
+        record_redis_error(e, f"Error acquiring cache lock for {cache_key}")
+        return True
+
+
+async def _aacquire_lock(cache_key: str):
+    if not redis_available():
+        return True
+    try:
+        lock = get_async_redis().lock(f"lock:{cache_key}", timeout=CACHE_LOCK_TIMEOUT)
+        return lock if await lock.acquire(blocking=False) else None
+    except Exception as e:
+        record_redis_error(e, f"Error acquiring cache lock for {cache_key}")
         return True
+
+
+def _release_lock(lock):
+    if lock is True:
+        return
+    try:
+        lock.release()
     except Exception as e:
-        logging.error(f"Error deleting pattern from Redis cache: {e}")
-        return False
\ No newline at end of file
+        # 計算超過鎖的存活時間，鎖已過期
+        logging.warning(f"Error releasing cache lock: {e}")
+
+
+async def _arelease_lock(lock):
+    if lock is True:
+        return
+    try:
+        await lock.release()
+    except Exception as e:
+        logging.warning(f"Error releasing cache lock: {e}")
+
+
+def _valid_entry(entry: Any) -> Optional[dict]:
+    # 舊格式的快取（沒有 fresh_until）視為未命中
+    if isinstance(entry, dict) and "fresh_until" in entry and "data" in entry:
+        return entry
+    return None
+
+
+def _get_entry(cache_key: str) -> Optional[dict]:
+    return _valid_entry(get_cache(cache_key))
+
+
+async def _aget_entry(cache_key: str) -> Optional[dict]:
+    return _valid_entry(await aget_cache(cache_key))
+
+
+_sync_waiters = threading.BoundedSemaphore(CACHE_SYNC_MAX_WAITERS)
+
+
+class _ValidatedValues:
+    """@cached 路由已驗證結果的 LRU（以筆數為上限）；以快取的 entry 物件比對，L1 的資料被替換後不再命中"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._values: "OrderedDict[str, Tuple[dict, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cache_key: str, entry: dict) -> Any:
+        with self._lock:
+            item = self._values.get(cache_key)
+            if item is None or item[0] is not entry:
+                return MISSING
+            self._values.move_to_end(cache_key)
+            return item[1]
+
+    def set(self, cache_key: str, entry: dict, value: Any):
+        with self._lock:
+            self._values[cache_key] = (entry, value)
+            self._values.move_to_end(cache_key)
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+
+
+def cached(
+    key: str,
+    response_model: Any,
+    ttl: int = DEFAULT_CACHE_TTL,
+    tags: Iterable[str] = (),
+    stale_ttl: int = 0
+):
+    """
+    路由快取裝飾器（放在 @router.get 之下）
+
+    key 與 tags 是以路徑 / 查詢參數填入的樣板，例如 "rentals:room:{room_id}:status:{status}"；
+    資料以 response_model（與路由相同）序列化，空結果也會被快取。
+    快取過期時只有取得鎖的請求會重新查詢，其他請求等待結果；
+    stale_ttl > 0 時，過期後的 stale_ttl 秒內其他請求直接回傳舊資料。
+    """
+    adapter = TypeAdapter(response_model)
+    tags = list(tags)
+    validated = _ValidatedValues(CACHE_VALIDATED_MAX_ENTRIES)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def resolve(args, kwargs):
+            arguments = signature.bind_partial(*args, **kwargs).arguments
+            return key.format(**arguments), [tag.format(**arguments) for tag in tags]
+
+        def load(cache_key: str, entry: dict):
+            # L1 命中時 entry 是同一個物件，沿用驗證過的結果，省去每次重建 Pydantic 模型（entry 與 L1 共用，不可修改）
+            value = validated.get(cache_key, entry)
+            if value is MISSING:
+                value = adapter.validate_python(entry["data"])
+                validated.set(cache_key, entry, value)
+            return value
+
+        def build_entry(result: Any):
+            value = adapter.validate_python(result, from_attributes=True)
+            return value, {"fresh_until": time.time() + ttl, "data": adapter.dump_python(value, mode="json")}
+
+        def store(cache_key: str, cache_tags: list, result: Any):
+            value, entry = build_entry(result)
+            set_cache(cache_key, entry, ttl + stale_ttl, tags=cache_tags)
+            validated.set(cache_key, entry, value)
+            return value
+
+        async def astore(cache_key: str, cache_tags: list, result: Any):
+            value, entry = build_entry(result)
+            await aset_cache(cache_key, entry, ttl + stale_ttl, tags=cache_tags)
+            validated.set(cache_key, entry, value)
+            return value
+
+        def check(cache_key: str, entry: Optional[dict]) -> bool:
+            if entry is not None and entry["fresh_until"] > time.time():
+                logging.info(f"Cache hit for {cache_key}")
+                return True
+            return False
+
+        def use_stale(cache_key: str, entry: Optional[dict], lock) -> bool:
+            if lock is None and entry is not None:
+                logging.info(f"Serving stale cache for {cache_key} while it is refreshed")
+                return True
+            return False
+
+        def lookup(cache_key: str):
+            """回傳 (快取資料, 鎖)：新鮮或可用的舊資料直接回傳，否則視情況取得鎖"""
+            entry = _get_entry(cache_key)
+            if check(cache_key, entry):
+                return entry, None
+            lock = _acquire_lock(cache_key)
+            if use_stale(cache_key, entry, lock):
+                return entry, None
+            return None, lock
+
+        async def alookup(cache_key: str):
+            entry = await _aget_entry(cache_key)
+            if check(cache_key, entry):
+                return entry, None
+            lock = await _aacquire_lock(cache_key)
+            if use_stale(cache_key, entry, lock):
+                return entry, None
+            return None, lock
+
+        def prime_many(results: Iterable[tuple]):
+            """不經路由直接寫入多筆快取（供預熱使用），results 為 (參數 dict, 結果) 的序列，以單一 pipeline 寫入"""
+            items, item_tags = {}, {}
+            for params, result in results:
+                cache_key = key.format(**params)
+                items[cache_key] = build_entry(result)[1]
+                item_tags[cache_key] = [tag.format(**params) for tag in tags]
+            if items:
+                set_many(items, ttl + stale_ttl, item_tags)
+            return len(items)
+
+        def prime(result: Any, **params):
+            return prime_many([(params, result)])
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                cache_key, cache_tags = resolve(args, kwargs)
+                entry, lock = await alookup(cache_key)
+                if entry is not None:
+                    return load(cache_key, entry)
+                if lock is None:
+                    # 其他請求正在重新計算，等待其結果；對方失敗（例如 404）釋放鎖後改由本請求計算
+                    deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+                    while time.monotonic() < deadline:
+                        await asyncio.sleep(CACHE_LOCK_POLL_INTERVAL)
+                        entry = await _aget_entry(cache_key)
+                        if entry is not None:
+                            return load(cache_key, entry)
+                        lock = await _aacquire_lock(cache_key)
+                        if lock is not None:
+                            break
+                    else:
+                        lock = True
+
+                logging.info(f"Cache miss for {cache_key}")
+                try:
+                    return await astore(cache_key, cache_tags, await func(*args, **kwargs))
+                finally:
+                    await _arelease_lock(lock)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                cache_key, cache_tags = resolve(args, kwargs)
+                entry, lock = lookup(cache_key)
+                if entry is not None:
+                    return load(cache_key, entry)
+                if lock is None and not _sync_waiters.acquire(blocking=False):
+                    # 等待中的同步請求已達上限，直接查詢，不再佔住 threadpool 等待
+                    lock = True
+                if lock is None:
+                    # 其他請求正在重新計算，等待其結果（同步路由在 threadpool 中執行）；
+                    # 對方失敗（例如 404）釋放鎖後改由本請求計算，不等到逾時
+                    try:
+                        deadline = time.monotonic() + CACHE_LOCK_TIMEOUT
+                        while time.monotonic() < deadline:
+                            time.sleep(CACHE_LOCK_POLL_INTERVAL)
+                            entry = _get_entry(cache_key)
+                            if entry is not None:
+                                return load(cache_key, entry)
+                            lock = _acquire_lock(cache_key)
+                            if lock is not None:
+                                break
+                        else:
+                            lock = True
+                    finally:
+                        _sync_waiters.release()
+
+                logging.info(f"Cache miss for {cache_key}")
+                try:
+                    return store(cache_key, cache_tags, func(*args, **kwargs))
+                finally:
+                    _release_lock(lock)
+
+        wrapper.prime = prime
+        wrapper.prime_many = prime_many
+        return wrapper
+
+    return decorator
+
+
+def codec_stats() -> Dict[str, Any]:
+    """累計的快取值大小：未壓縮（raw_bytes）與實際儲存（stored_bytes）"""
+    stats = redis_client.hgetall(CODEC_STATS_KEY)
+    raw_bytes = int(stats.get("raw_bytes", 0))
+    stored_bytes = int(stats.get("stored_bytes", 0))
+    return {
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "saved_bytes": raw_bytes - stored_bytes,
+        "saved_ratio": round(1 - stored_bytes / raw_bytes, 4) if raw_bytes else 0,
+    }
@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import random
+import logging
+from collections import deque
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils.query_stats import normalize_statement, get_current_stats
+
+logger = logging.getLogger("db.slow_query")
+tz = timezone(timedelta(hours=8))
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 500))
+# 慢查詢中執行 EXPLAIN 的抽樣比例（0 表示不執行）
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.1))
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", 200))
+
+# 本 worker 最近的慢查詢紀錄
+_slow_queries = deque(maxlen=SLOW_QUERY_BUFFER_SIZE)
+
+
+def _value_shape(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: type(item).__name__ for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [type(item).__name__ for item in value]
+    return type(value).__name__
+
+
+def parameter_shape(parameters: Any, executemany: bool) -> Any:
+    """只記錄參數的型別，不記錄實際值"""
+    if parameters is None:
+        return None
+    if executemany:
+        return {
+            "rows": len(parameters),
+            "row": _value_shape(parameters[0]) if parameters else None
+        }
+    return _value_shape(parameters)
+
+
+def _explain(conn, statement: str, parameters: Any) -> Optional[List[Dict[str, Any]]]:
+    """以同一條連線的新 cursor 取得查詢計畫，只支援 SELECT"""
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return None
+
+    dialect = conn.dialect.name
+    if dialect == "mysql":
+        explain_sql = f"EXPLAIN {statement}"
+    elif dialect == "sqlite":
+        explain_sql = f"EXPLAIN QUERY PLAN {statement}"
+    else:
+        return None
+
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(explain_sql, parameters or ())
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_slow_query_start", None)
+    if start is None:
+        return
+    duration_ms = (time.perf_counter() - start) * 1000
+    if duration_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    stats = get_current_stats()
+    record = {
+        "event": "slow_query",
+        "timestamp": datetime.now(tz).isoformat(),
+        "pid": os.getpid(),
+        "duration_ms": round(duration_ms, 3),
+        "statement": normalize_statement(statement),
+        "params": parameter_shape(parameters, executemany),
+        "route": stats.route if stats else None,
+        "explain": None,
+    }
+
+    # server-side cursor（stream_results）的結果尚未讀完，在同一條連線上執行 EXPLAIN 會丟棄剩餘結果
+    streaming = context.execution_options.get("stream_results", False)
+    if not executemany and not streaming and random.random() < SLOW_QUERY_EXPLAIN_SAMPLE_RATE:
+        try:
+            record["explain"] = _explain(conn, statement, parameters)
+        except Exception as e:
+            logger.debug(f"EXPLAIN failed for slow query: {e}")
+
+    _slow_queries.append(record)
+    logger.warning(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def get_slow_queries(limit: int = 50) -> List[Dict[str, Any]]:
+    """回傳本 worker 最近的慢查詢（新到舊）"""
+    return list(reversed(_slow_queries))[:limit]
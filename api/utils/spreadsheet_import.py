@@ -0,0 +1,174 @@
+import os
+import zlib
+from typing import Dict, Iterator, List
+from zipfile import BadZipFile
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+
+# 每個交易寫入的列數
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 500))
+
+# 標準欄位名稱 -> 可接受的表頭（不分大小寫）
+ELECTRIC_COLUMNS = {
+    "room_number": ["room_number", "房號", "房間"],
+    "year": ["year", "年", "年份"],
+    "month": ["month", "月", "月份"],
+    "reading": ["reading", "讀數", "電表讀數"],
+}
+ELECTRIC_REQUIRED = ["room_number", "year", "month", "reading"]
+
+PAYMENT_COLUMNS = {
+    "room_number": ["room_number", "房號", "房間"],
+    "date": ["date", "日期", "繳費日期"],
+    "income": ["income", "amount", "金額"],
+    "title": ["title", "標題", "項目"],
+    "accounting_tag": ["accounting_tag", "tag", "類別"],
+    "payment_method": ["payment_method", "繳納方式"],
+}
+PAYMENT_REQUIRED = ["room_number", "date", "income"]
+DEFAULT_PAYMENT_TAG = "租金"
+
+# 讀取表頭與第一批時檔案無法讀取（表頭錯誤、CSV 格式錯誤、編碼錯誤、非 XLSX 或損毀的壓縮檔）的例外，
+# 此時尚未寫入任何資料，路由回傳 400；openpyxl 讀到缺少必要內容的 zip 時會拋出 KeyError
+SPREADSHEET_ERRORS = (ValueError, pd.errors.ParserError, BadZipFile, InvalidFileException, KeyError)
+# 之後的批次讀取失敗時的例外（檔案中段損毀）；先前的批次已提交，路由停止匯入並照常回傳報表
+CHUNK_READ_ERRORS = (pd.errors.ParserError, UnicodeDecodeError, BadZipFile, zlib.error)
+
+ROW_COLUMN = "_row"
+ERROR_COLUMN = "_error"
+
+
+def _canonical_header(header: List, spec: Dict[str, List[str]], required: List[str]) -> List:
+    """將表頭轉為標準欄位名稱，無法辨識的欄位保留原名"""
+    aliases = {alias.lower(): name for name, names in spec.items() for alias in names}
+    columns = [aliases.get(str(cell).strip().lower(), cell) if cell is not None else None for cell in header]
+    missing = [name for name in required if name not in columns]
+    if missing:
+        raise ValueError(f"缺少必要欄位: {', '.join(missing)}")
+    return columns
+
+
+def iter_chunks(
+    path: str,
+    filename: str,
+    spec: Dict[str, List[str]],
+    required: List[str],
+    chunk_size: int = IMPORT_CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """逐批讀取 CSV / XLSX（不整份載入記憶體），每批附上原始列號"""
+    wanted = list(spec.keys())
+
+    if filename.lower().endswith(".csv"):
+        header = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns.tolist()
+        columns = _canonical_header(header, spec, required)
+        reader = pd.read_csv(path, chunksize=chunk_size, dtype=str, encoding="utf-8-sig", skip_blank_lines=False)
+        for chunk in reader:
+            chunk.columns = columns
+            chunk = _select(chunk, wanted)
+            chunk[ROW_COLUMN] = chunk.index + 2  # 第 1 列為表頭
+            yield chunk.dropna(how="all", subset=wanted)
+        return
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = _canonical_header(list(header), spec, required)
+
+        batch, row_numbers = [], []
+        for row_number, row in enumerate(rows, start=2):
+            if all(cell is None or str(cell).strip() == "" for cell in row):
+                continue
+            row = tuple(row[:len(columns)])
+            batch.append(row + (None,) * (len(columns) - len(row)))
+            row_numbers.append(row_number)
+            if len(batch) >= chunk_size:
+                yield _frame(batch, row_numbers, columns, wanted)
+                batch, row_numbers = [], []
+        if batch:
+            yield _frame(batch, row_numbers, columns, wanted)
+    finally:
+        workbook.close()
+
+
+def _select(frame: pd.DataFrame, wanted: List[str]) -> pd.DataFrame:
+    """只保留需要的欄位（重複的表頭以第一欄為準）"""
+    return frame.loc[:, ~frame.columns.duplicated()].reindex(columns=wanted)
+
+
+def _frame(batch: List, row_numbers: List[int], columns: List, wanted: List[str]) -> pd.DataFrame:
+    frame = _select(pd.DataFrame.from_records(batch, columns=columns), wanted)
+    frame[ROW_COLUMN] = row_numbers
+    return frame
+
+
+def _add_error(errors: pd.Series, mask: pd.Series, message: str) -> pd.Series:
+    """向量化地為符合 mask 的列附加錯誤訊息"""
+    return errors.where(~mask, np.where(errors == "", message, errors + "; " + message))
+
+
+def _text(series: pd.Series) -> pd.Series:
+    return series.where(series.notna(), "").astype(str).str.strip()
+
+
+def validate_electric_chunk(chunk: pd.DataFrame, room_map: Dict[str, int]) -> pd.DataFrame:
+    """驗證電表讀數並對應房間，回傳附上 room_id 與錯誤欄位的 DataFrame"""
+    frame = chunk.copy()
+    frame["room_number"] = _text(frame["room_number"])
+    frame["room_id"] = frame["room_number"].map(room_map)
+    frame["year"] = pd.to_numeric(frame["year"], errors="coerce")
+    frame["month"] = pd.to_numeric(frame["month"], errors="coerce")
+    frame["reading"] = pd.to_numeric(frame["reading"], errors="coerce")
+
+    errors = pd.Series("", index=frame.index)
+    errors = _add_error(errors, frame["room_id"].isna(), "找不到房號")
+    errors = _add_error(errors, frame["year"].isna() | (frame["year"] % 1 != 0), "年份格式錯誤")
+    errors = _add_error(errors, ~frame["month"].between(1, 12) | (frame["month"] % 1 != 0), "月份必須介於 1 到 12")
+    errors = _add_error(errors, frame["reading"].isna() | (frame["reading"] < 0), "讀數格式錯誤")
+    # 同一批中重複的房間與年月以最後一筆為準
+    duplicated = frame.duplicated(subset=["room_id", "year", "month"], keep="last") & frame["room_id"].notna()
+    errors = _add_error(errors, duplicated, "重複的房間與年月（以最後一筆為準）")
+
+    frame[ERROR_COLUMN] = errors
+    return frame
+
+
+def validate_payment_chunk(
+    chunk: pd.DataFrame,
+    room_map: Dict[str, int],
+    rentals: pd.DataFrame
+) -> pd.DataFrame:
+    """驗證繳費資料，並以 merge_asof 對應到繳費當時的租約（room_id + 起租日）"""
+    frame = chunk.copy()
+    frame["room_number"] = _text(frame["room_number"])
+    frame["room_id"] = frame["room_number"].map(room_map)
+    frame["date"] = pd.to_datetime(frame["date"], errors="coerce")
+    frame["income"] = pd.to_numeric(frame["income"], errors="coerce")
+    frame["accounting_tag"] = _text(frame["accounting_tag"]).replace("", DEFAULT_PAYMENT_TAG)
+    frame["title"] = _text(frame["title"])
+    frame["title"] = frame["title"].where(frame["title"] != "", frame["accounting_tag"])
+    payment_method = _text(frame["payment_method"])
+    frame["payment_method"] = payment_method.where(payment_method != "", None)
+
+    frame["rental_id"] = np.nan
+    matchable = frame["room_id"].notna() & frame["date"].notna()
+    if matchable.any() and not rentals.empty:
+        left = frame.loc[matchable, ["date", "room_id"]].reset_index().sort_values("date")
+        left["room_id"] = left["room_id"].astype("int64")
+        matched = pd.merge_asof(
+            left, rentals, left_on="date", right_on="start_date", by="room_id", direction="backward"
+        ).set_index("index")
+        frame.loc[matched.index, "rental_id"] = matched["rental_id"]
+
+    errors = pd.Series("", index=frame.index)
+    errors = _add_error(errors, frame["room_id"].isna(), "找不到房號")
+    errors = _add_error(errors, frame["date"].isna(), "日期格式錯誤")
+    errors = _add_error(errors, frame["income"].isna(), "金額格式錯誤")
+    errors = _add_error(errors, matchable & frame["rental_id"].isna(), "找不到該日期的租約")
+
+    frame[ERROR_COLUMN] = errors
+    return frame
@@ -0,0 +1,81 @@
+import os
+from typing import Optional
+from utils.redis_config import redis_client, redis_available, redis_breaker, record_redis_error, get_async_redis
+
+# 每位使用者的 token 版本以 users.token_version 為準（停用、角色或密碼變更時在同一交易中遞增）
+# Redis 只是讀取快取：鍵不存在或 Redis 無法使用時回傳 None，由呼叫端查詢資料庫
+TOKEN_VERSION_CACHE_TTL = int(os.getenv("TOKEN_VERSION_CACHE_TTL", 300))
+
+
+def _version_key(user_id: int) -> str:
+    return f"auth:token_version:db:{user_id}"
+
+
+def get_token_version(user_id: int) -> Optional[int]:
+    """回傳快取中的版本，未快取或 Redis 無法使用（或斷路器開路）時回傳 None"""
+    if not redis_available(redis_client):
+        return None
+
+    try:
+        value = redis_client.get(_version_key(user_id))
+        redis_breaker.record_success()
+        return int(value) if value is not None else None
+    except Exception as e:
+        record_redis_error(e, "Error getting token version from Redis")
+        return None
+
+
+async def aget_token_version(user_id: int) -> Optional[int]:
+    """get_token_version 的非同步版本"""
+    if not redis_available(redis_client):
+        return None
+
+    try:
+        value = await get_async_redis().get(_version_key(user_id))
+        redis_breaker.record_success()
+        return int(value) if value is not None else None
+    except Exception as e:
+        record_redis_error(e, "Error getting token version from Redis")
+        return None
+
+
+def forget_token_version(user_id: int) -> bool:
+    """撤銷前先刪除快取的版本，Redis 無法使用時回傳 False"""
+    if not redis_available(redis_client):
+        return False
+
+    try:
+        redis_client.delete(_version_key(user_id))
+        redis_breaker.record_success()
+        return True
+    except Exception as e:
+        record_redis_error(e, "Error deleting token version from Redis")
+        return False
+
+
+def cache_token_version(user_id: int, version: Optional[int]):
+    """寫入自資料庫讀到（或剛遞增）的版本；version 為 None 表示使用者已刪除，移除快取"""
+    if not redis_available(redis_client):
+        return
+
+    try:
+        if version is None:
+            redis_client.delete(_version_key(user_id))
+        else:
+            redis_client.set(_version_key(user_id), version, ex=TOKEN_VERSION_CACHE_TTL)
+        redis_breaker.record_success()
+    except Exception as e:
+        # 資料庫已是最新版本；快取中的舊值最多保留 TOKEN_VERSION_CACHE_TTL 秒
+        record_redis_error(e, "Error caching token version in Redis")
+
+
+async def acache_token_version(user_id: int, version: int):
+    """cache_token_version 的非同步版本（驗證時以資料庫的值回填）"""
+    if not redis_available(redis_client):
+        return
+
+    try:
+        await get_async_redis().set(_version_key(user_id), version, ex=TOKEN_VERSION_CACHE_TTL)
+        redis_breaker.record_success()
+    except Exception as e:
+        record_redis_error(e, "Error caching token version in Redis")